@@ -1,7 +1,6 @@
 
-function list_index(id, event) {
+function list_index(list, event) {
 	var item = event.target;
-	var list = window.document.getElementById(id);
 	if(item == list)
 		return -1;
 	while(item.parentNode != list)
@@ -14,17 +13,17 @@ function list_index(id, event) {
 	return i;
 }
 
-function list_on_click(id, event) {
-	const index = list_index(id, event);
+function list_on_click(element, event) {
+	const index = list_index(element, event);
 	if(index >= 0)
-		ui_send({id: id, action: "select", item: index});
+		ui_send({id: element.id, action: "select", item: index});
 }
 
-function list_on_context_menu(id, event) {
+function list_on_context_menu(element, event) {
 	event.preventDefault();
-	const index = list_index(id, event);
+	const index = list_index(element, event);
 	if(index >= 0)
-		ui_send({id: id, action: "menu", item: index});
+		ui_send({id: element.id, action: "menu", item: index});
 }
 
 function list_select(args) {
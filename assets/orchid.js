@@ -149,6 +149,11 @@ function ui_process_answers() {
 				component = document.getElementById(a.id);
 				component.innerHTML = a.content;
 				break;
+			case "patch":
+				component = document.getElementById(a.id);
+				if(component == null || !ui_patch(component, a.ops))
+					ui_post({id: a.comp, action: "refresh", target: a.id});
+				break;
 			case "clear":
 				component = document.getElementById(a.id);
 				while(component.firstChild)
@@ -227,6 +232,50 @@ function ui_process_answers() {
 	ui_release();
 }
 
+function ui_fragment(html) {
+	const template = document.createElement("template");
+	template.innerHTML = html;
+	return template.content;
+}
+
+function ui_patch(root, ops) {
+	for(const op of ops) {
+		let node = root;
+		for(const i of op.path) {
+			node = node.childNodes[i];
+			if(node == undefined)
+				return false;
+		}
+		if(op.tag != null && node.nodeName.toLowerCase() != op.tag)
+			return false;
+		switch(op.op) {
+		case "set-attr":
+			node.setAttribute(op.attr, op.val);
+			break;
+		case "remove-attr":
+			node.removeAttribute(op.attr);
+			break;
+		case "text":
+			node.nodeValue = op.text;
+			break;
+		case "replace":
+			node.replaceWith(ui_fragment(op.html));
+			break;
+		case "insert":
+			if(op.pos > node.childNodes.length)
+				return false;
+			node.insertBefore(ui_fragment(op.html), node.childNodes[op.pos] ?? null);
+			break;
+		case "remove":
+			if(op.pos >= node.childNodes.length)
+				return false;
+			node.childNodes[op.pos].remove();
+			break;
+		}
+	}
+	return true;
+}
+
 function ui_reanswer() {
 	ui_process_answers();
 }
@@ -257,9 +306,13 @@ function ui_replace(msg) {
 	ui_post(msg);
 }
 
+var ui_before_send = [];
+
 function ui_complete() {
 	if(ui_messages.length == 0)
 		return;
+	for(const hook of ui_before_send)
+		hook();
 	ui_busy = true;
 	ui_http.open("POST", "ui", true);
 	let messages = ui_messages;
@@ -312,6 +365,88 @@ function ui_onclick(id) {
 	ui_send({id: id, action: "click"});
 }
 
+function ui_on_click(element, event) {
+	ui_send({id: element.id, action: "click"});
+}
+
+
+// Event delegation
+
+const UI_EVENTS = [
+	"change",
+	"click",
+	"contextmenu",
+	"dblclick",
+	"focusin",
+	"focusout",
+	"input",
+	"keydown",
+	"keyup",
+	"mouseover"
+];
+
+var ui_keys = {};
+
+function ui_dispatch(event) {
+	const attr = "data-on-" + event.type;
+	for(let elt = event.target; elt != null && elt.nodeType == 1; elt = elt.parentNode) {
+		const fun = elt.getAttribute(attr);
+		if(fun != null) {
+			const f = window[fun];
+			if(f == undefined)
+				console.error(`cannot find function ${fun}`);
+			else
+				f(elt, event);
+		}
+		if(event.type == "keyup" && elt.id in ui_keys)
+			ui_handle_key(elt, event);
+		if(event.cancelBubble)
+			break;
+	}
+}
+
+for(const type of UI_EVENTS)
+	document.addEventListener(type, ui_dispatch, true);
+
+var ui_preds = {};
+
+function ui_set_pred(args) {
+	if(args.expr == null)
+		delete ui_preds[args.id];
+	else
+		ui_preds[args.id] = {
+			deps: args.deps,
+			fun: new Function(`return ${args.expr};`)
+		};
+}
+
+function ui_check_preds(id) {
+	for(const [target, pred] of Object.entries(ui_preds))
+		if(pred.deps.includes(id)) {
+			const element = document.getElementById(target);
+			if(element == null)
+				continue;
+			if(pred.fun())
+				element.removeAttribute("disabled");
+			else
+				element.setAttribute("disabled", "");
+		}
+}
+
+function ui_set_keys(args) {
+	if(args.keys.length == 0)
+		delete ui_keys[args.id];
+	else
+		ui_keys[args.id] = args.keys;
+}
+
+function ui_add_key(args) {
+	if(args.id in ui_keys)
+		ui_keys[args.id].push(args.key);
+	else
+		ui_keys[args.id] = [args.key];
+}
+
 
 // Timer
 
@@ -342,7 +477,29 @@ function ui_timer_stop(args) {
 	}
 }
 
-function ui_on_focus(event) {
+
+// Polling
+
+var ui_poll_timer = null;
+
+function ui_poll_start(args) {
+	if(ui_poll_timer == null)
+		ui_poll_timer = setInterval(ui_poll, args.period);
+}
+
+function ui_poll_stop(args) {
+	if(ui_poll_timer != null) {
+		clearInterval(ui_poll_timer);
+		ui_poll_timer = null;
+	}
+}
+
+function ui_poll() {
+	if(!ui_busy)
+		ui_send({ id: "0", action: "poll" });
+}
+
+function ui_on_focus(element, event) {
 	let target = event.target;
 	if(target == null)
 		return;
@@ -351,7 +508,8 @@ function ui_on_focus(event) {
 	ui_send({id: "0", action: "focus", target: target.id});
 }
 
-function ui_handle_key(element, event, keys) {
+function ui_handle_key(element, event) {
+	const keys = ui_keys[element.id];
 
 	// prepare mask
 	let mask = 0;
@@ -93,7 +93,7 @@ function table_on_change() {
 	ui_send({id: table_edit.id, action: "test", value: table_edit.input.value});
 }
 
-function table_on_click(id, event) {
+function table_on_click(element, event) {
 	var td = event.target;
 	var tr = td.parentNode;
 	var col;
@@ -106,8 +106,8 @@ function table_on_click(id, event) {
 	if(row == tbody.children.length)
 		return;
 	table_edit.cell = td;
-	table_edit.id = id;
-	ui_send({id: id, action: "is_editable", row: row, col: col});
+	table_edit.id = element.id;
+	ui_send({id: element.id, action: "is_editable", row: row, col: col});
 }
 
 function table_over(element, event) {
@@ -24,7 +24,8 @@ from orchid.console import Console
 from orchid.editor import Editor
 from orchid.field import Field, ColorField, DateField, TimeField, \
 	DateTimeField, PasswordField, EmailField, RangeField, \
-	Select, as_natural, as_re, Form, ProposalField
+	Select, as_natural, as_re, as_length, constrain, Form, Sync, \
+	ProposalField, Corpus
 from orchid.group import HGroup, VGroup, Spring, LayeredPane, hspring, vspring, \
 	HSpace
 from orchid.image import Icon, Image, AssetImage, IconType
@@ -33,7 +34,8 @@ from orchid.listview import ListView
 from orchid import mind
 from orchid.mind import Type, Types, Entity, Var, \
 	EnableObserver, AbstractPredicate, Predicate, AbstractAction, Action, \
-	not_null, equals, not_, is_password, if_error, matches, is_null
+	not_null, equals, not_, is_password, if_error, matches, is_null, batch, computed, \
+	offload
 from orchid.models import \
 	ListObserver, ListModel, ListVar, \
 	SetObserver, SetModel, SetVar, \
@@ -44,8 +46,9 @@ from orchid.shift_selector import ShiftSelector
 from orchid.struct import Header, ToolBar, MessageContainer, StatusBar, ButtonBar
 from orchid.tabbedpane import TabbedPane, Tab
 from orchid.table import TableView
+from orchid.template import Template
 from orchid.util import Interface, buffer, Pos, Dir, Align, Context, \
-	MessageType, Observer, Subject, Buffer
+	MessageType, Observer, Subject, Buffer, ByteBuffer
 from orchid.view import InteractiveView
 
 # deprecated
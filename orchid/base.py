@@ -17,19 +17,22 @@
 
 """Orchid base classes and definitions. """
 
+from collections import deque
 import html
 import importlib
+import json
 import os.path
-from threading import Thread
+from threading import Lock, Thread, current_thread
 import time
 from time import sleep
 
-from orchid import server
-from orchid.mind import Action
-from orchid.util import Buffer, STANDARD_INTERFACE, Subject, Context
+from orchid import diff, job, server
+from orchid.mind import Action, batch
+from orchid.util import Buffer, buffer, STANDARD_INTERFACE, Subject, Context
 from orchid.displayable import Displayable
 
 CLOSE_TIMEOUT=0.250
+POLL_PERIOD=100
 
 
 def write_nothing(page, out):
@@ -37,6 +40,21 @@ def write_nothing(page, out):
 	pass
 
 
+def cached(gen):
+	"""Decorator for gen() methods of components whose generated HTML is
+	kept and reused as long as the component (and its children) are not
+	modified. The cache is only used if the component is cacheable (see
+	AbstractComponent.is_cacheable())."""
+	def cached_gen(self, out):
+		if not self.is_cacheable():
+			gen(self, out)
+		else:
+			if self.fragment is None or self.fragment[0] != self.version:
+				self.fragment = (self.version, buffer(lambda buf: gen(self, buf)))
+			out.write(self.fragment[1])
+	return cached_gen
+
+
 class Key:
 	ALT = 0x01
 	CONTROL = 0x02
@@ -181,6 +199,47 @@ class AbstractComponent(Displayable, Subject):
 		self.page = None
 		self.shown = False
 		self.keys = []
+		self.version = 0
+		self.fragment = None
+		self.attrs_text = None
+		self.incremental = False
+		self.sent = {}
+
+	def invalidate(self):
+		"""Signal that the HTML of the component changed: the cached HTML
+		of the component and of its parents are no more valid."""
+		comp = self
+		while comp is not None:
+			comp.version += 1
+			comp = comp.parent
+
+	def set_incremental(self, incremental=True):
+		"""In incremental mode, set_content() keeps the sent content and
+		only sends the operations to patch the previous content into the new
+		one. Useful for big components re-generated after small changes."""
+		self.incremental = incremental
+		self.sent = {}
+
+	def structure_changed(self):
+		"""Signal that the HTML structure of the remote component changed
+		without set_content() (and so of its parents): the contents kept in
+		incremental mode are no more usable."""
+		comp = self
+		while comp is not None:
+			if comp.sent:
+				comp.sent = {}
+			comp = comp.parent
+
+	def attrs_changed(self):
+		"""Signal that the attributes, style or classes changed."""
+		self.attrs_text = None
+		self.invalidate()
+
+	def is_cacheable(self):
+		"""Test if the HTML of the component only depends on its attributes,
+		style, classes and content, that is, if the HTML can be cached until
+		invalidate() is called. Default implementation returns False."""
+		return False
 
 	def key(self, key, action, mask=0):
 		"""Add a key to the component. action may a mind.Action or a function
@@ -188,9 +247,24 @@ class AbstractComponent(Displayable, Subject):
 		Returns the object itself that makes usable in component construction."""
 		self.keys.append(Key(key, action, mask))
 		if self.online():
-			self.make_keys()
+			self.call("ui_add_key", {
+				"id": self.get_id(),
+				"key": self.get_key_map()[-1]
+			})
 		return self
 
+	def set_event(self, event, fun):
+		"""Install a Javascript handler for the given HTML event (without "on"
+		prefix). fun is the name of a Javascript function taking as parameters
+		the element and the event. The handler is not installed inline but as
+		a data-on-EVENT attribute dispatched by the page-level listener of
+		orchid.js. Return the component itself for chaining."""
+		return self.set_attr(f"data-on-{event}", fun)
+
+	def remove_event(self, event):
+		"""Remove a handler installed by set_event()."""
+		self.remove_attr(f"data-on-{event}")
+
 	def get_page(self):
 		"""Get the page containing the component."""
 		return self.page
@@ -237,36 +311,44 @@ class AbstractComponent(Displayable, Subject):
 	def gen_attrs(self, out):
 		"""Generate common attributes"""
 
-		# generate keys
-		if self.keys:
-			self.make_keys()
-
-		# generate attribute themselves
 		out.write(f' id="{self.get_id()}"')
+		if self.attrs_text is None:
+			self.attrs_text = self.make_attrs()
+		out.write(self.attrs_text)
+
+	def make_attrs(self):
+		"""Build the text of style, classes and attributes as generated by
+		gen_attrs()."""
+		text = []
 
 		# generate style
 		if self.style:
-			out.write(' style="')
+			text.append(' style="')
 			for (k, x) in self.style.items():
-				out.write(f"{k}: {self.make_attr(x)}; ")
-			out.write('"')
+				text.append(f"{k}: {self.make_attr(x)}; ")
+			text.append('"')
 
 		# generate classes
 		if self.classes:
-			out.write(f' class="{" ".join(self.classes)}"')
+			text.append(f' class="{" ".join(self.classes)}"')
 
 		# generate attributes
 		for (att, val) in self.attrs.items():
 			if val is None:
-				out.write(f" {att}")
+				text.append(f" {att}")
 			else:
-				out.write(f" {att}=\"{self.make_attr(val)}\"")
+				text.append(f" {att}=\"{self.make_attr(val)}\"")
+
+		return "".join(text)
+
+	def get_key_map(self):
+		"""Get the key map as recorded in the key table of the page."""
+		return [{"mask": k.mask, "key": k.key, "action": i}
+			for (i, k) in enumerate(self.keys)]
 
 	def make_keys(self):
-		"""Generate the content of attribute to handle keys."""
-		map = ",".join(f"{{mask: {k.mask}, key: '{k.key}', action: {i} }}" \
-			for (i, k) in enumerate(self.keys))
-		self.set_attr('onkeyup', f'ui_handle_key(this, event, [{map}]);')
+		"""Update the key table of the remote page for this component."""
+		self.call("ui_set_keys", {"id": self.get_id(), "keys": self.get_key_map()})
 
 	def make_msg(self, type, id=None, nth=None):
 		"""Build a standatd message."""
@@ -287,6 +369,7 @@ class AbstractComponent(Displayable, Subject):
 		"""Send a message to set a style. Return component itself for
 		chaining at compilation time."""
 		self.style[attr] = val
+		self.attrs_changed()
 		if self.online():
 			self.send({
 				"type": "set-style",
@@ -310,6 +393,7 @@ class AbstractComponent(Displayable, Subject):
 		if id is None:
 			id = self.get_id()
 			self.attrs[attr] = val
+			self.attrs_changed()
 		if self.online():
 			self.send({
 				"type": "set-attr",
@@ -326,6 +410,7 @@ class AbstractComponent(Displayable, Subject):
 		the remote page."""
 		# TODO: maybe obsolete.
 		self.attrs[attr] = val
+		self.attrs_changed()
 
 	def get_attr(self, attr, default=None):
 		"""Get the value of an attribute. Return default if the attribute is
@@ -342,6 +427,7 @@ class AbstractComponent(Displayable, Subject):
 			if id is None:
 				id = self.get_id()
 				del self.attrs[attr]
+				self.attrs_changed()
 			if self.online():
 				self.send({"type": "remove-attr", "id": id, "attr": attr})
 		except KeyError:
@@ -353,8 +439,7 @@ class AbstractComponent(Displayable, Subject):
 		# TODO: maybe obsolete
 		try:
 			del self.attrs[attr]
-			if self.online():
-				self.send({"type": "remove-attr", "id": self.get_id(), "attr": attr})
+			self.attrs_changed()
 		except KeyError:
 			pass
 
@@ -364,16 +449,49 @@ class AbstractComponent(Displayable, Subject):
 		if id is None:
 			id = self.get_id()
 		msg = { "type": "append", "id": self.get_id() }
+		self.invalidate()
+		self.structure_changed()
 		self.send(msg)
 		msg['content'] = self.gen_as_text(content)
 
 	def set_content(self, content, id=None):
-		"""Change the content of an element. Content may be string or component."""
+		"""Change the content of an element. Content may be string or component.
+		In incremental mode, only the differences with the previous content
+		are sent."""
 		if id is None:
 			id = self.get_id()
 		msg = { "type": "set-content", "id": id }
+		self.invalidate()
+		if self.parent is not None:
+			self.parent.structure_changed()
 		self.send(msg)
-		msg['content'] = self.gen_as_text(content)
+		text = self.gen_as_text(content)
+		if not self.incremental:
+			msg['content'] = text
+		else:
+			tree = diff.parse(text)
+			try:
+				ops = diff.diff(self.sent[id][1], tree)
+			except KeyError:
+				ops = None
+			self.sent[id] = (text, tree)
+			if ops is not None and diff.ops_size(ops) < len(text):
+				msg['type'] = "patch"
+				msg['comp'] = self.get_id()
+				msg['ops'] = ops
+			else:
+				msg['content'] = text
+
+	def refresh_content(self, id=None):
+		"""Send again the whole content kept in incremental mode (used when
+		the remote page failed to apply a patch)."""
+		if id is None:
+			id = self.get_id()
+		try:
+			(text, _) = self.sent.pop(id)
+			self.set_content(text, id)
+		except KeyError:
+			pass
 
 	def insert_content(self, content, pos, id=None):
 		"""Insert the given content into the current element at the
@@ -385,17 +503,23 @@ class AbstractComponent(Displayable, Subject):
 			"id": id,
 			"pos": pos
 		}
+		self.invalidate()
+		self.structure_changed()
 		self.send(msg)
 		msg['content'] = self.gen_as_text(content)
 
 	def clear_content(self):
 		"""Clear the content of the component."""
+		self.invalidate()
+		self.structure_changed()
 		self.send({ "type": "clear", "id": self.get_id()})
 
 	def remove_content(self, pos, id=None):
 		"""Remove a child at given index from the current component."""
 		if id is None:
 			id = self.get_id()
+		self.invalidate()
+		self.structure_changed()
 		self.send({
 			"type": "remove",
 			"id": id,
@@ -423,6 +547,7 @@ class AbstractComponent(Displayable, Subject):
 				return self
 			id = self.get_id()
 			self.classes.append(cls)
+			self.attrs_changed()
 		if self.online():
 			self.send({"type": "add-class", "id": id, "nth": nth, "class": cls})
 		return self
@@ -438,9 +563,24 @@ class AbstractComponent(Displayable, Subject):
 				return
 			id = self.get_id()
 			self.classes.remove(cls)
+			self.attrs_changed()
 		if self.online():
 			self.send({"type": "remove-class", "id": id, "nth": nth, "class": cls})
 
+	def add_class_async(self, cls):
+		"""Add a class to the component without propagating it to the remote
+		page (that is expected to have already performed the change)."""
+		if cls not in self.classes:
+			self.classes.append(cls)
+			self.attrs_changed()
+
+	def remove_class_async(self, cls):
+		"""Remove a class of the component without propagating it to the
+		remote page."""
+		if cls in self.classes:
+			self.classes.remove(cls)
+			self.attrs_changed()
+
 	def set_top_class(self, cls):
 		"""Customize the component as a top component with the given class. The
 		default implementation applies the style to the page."""
@@ -522,9 +662,15 @@ class Component(AbstractComponent):
 	def get_children(self):
 		return []
 
+	def get_js_value(self):
+		"""Get a Javascript expression giving the value edited by the
+		component in the client. Return None if the component does not support
+		it (default implementation)."""
+		return None
+
 	def send(self, msg):
 		"""Send a message to the UI."""
-		self.page.messages.append(msg)
+		self.page.send(msg)
 
 	# !!CHECK!! check usage! Seems deprecated.
 	def send_classes(self, classes, id = None):
@@ -595,6 +741,8 @@ class Component(AbstractComponent):
 	def receive(self, msg, handler):
 		if msg["action"] == "key":
 			self.keys[msg["idx"]].trigger(self)
+		elif msg["action"] == "refresh":
+			self.refresh_content(msg["target"])
 		else:
 			AbstractComponent.receive(self, msg, handler)
 
@@ -647,6 +795,10 @@ class Page(AbstractComponent):
 	app = None, title = None, style = "default.css", theme = "basic", interface=STANDARD_INTERFACE):
 		AbstractComponent.__init__(self)
 		self.messages = []
+		self.lock = Lock()
+		self.posted = deque()
+		self.thread = None
+		self.polling = 0
 		self.is_online = False
 		self.parent = parent
 		self.app = app
@@ -660,14 +812,14 @@ class Page(AbstractComponent):
 		self.manager = None
 		self.style_paths = []
 		self.focus_id = None
+		self.bindings = {}
 		self.set_attr("onbeforeunload", "ui_close();")
 		self.set_attr("onload", 'ui_hi();')
-		self.set_attr("onfocusin", "ui_on_focus(event);")
+		self.set_event("focusin", "ui_on_focus")
 
 		# prepare the theme
 		if isinstance(theme, str):
-			m = importlib.import_module(f"orchid.themes.{theme}")
-			theme = m.get()
+			theme = get_theme(theme)
 		self.theme = theme
 
 		# install main component
@@ -750,14 +902,10 @@ class Page(AbstractComponent):
 
 	def download_model(self, model):
 		"""Update a remote page with the model of a new added component."""
-		script = Buffer()
-		model.gen_script(script)
-		style = Buffer()
-		model.gen_style(style)
 		self.send({
 			"type": "model",
-			"script": str(script),
-			"style": str(style),
+			"script": buffer(model.gen_script),
+			"style": buffer(model.gen_style),
 			"script_paths": model.get_script_paths(),
 			"style_paths": model.get_style_paths()
 		})
@@ -767,6 +915,40 @@ class Page(AbstractComponent):
 		comp.page = self
 		self.components[comp.get_id()] = comp
 		self.add_model(comp.get_model())
+		if comp.keys and self.online():
+			comp.make_keys()
+
+	def bind(self, var, comp):
+		"""Record that the component comp displays and edits the variable var.
+		Used to find the client-side value of variables."""
+		if id(var) not in self.bindings:
+			self.bindings[id(var)] = comp
+
+	def get_binding(self, var):
+		"""Get the component bound to the variable or None."""
+		return self.bindings.get(id(var))
+
+	def compile_js(self, fun):
+		"""Compile an expression to be evaluated by the client. fun takes as
+		parameter the function giving the Javascript value of variables and
+		returns the expression (like AbstractPredicate.to_js()). Return a pair
+		(Javascript expression, identifiers of components the expression
+		depends on) or None if the expression cannot be evaluated by the
+		client."""
+		deps = []
+		def env(var):
+			comp = self.get_binding(var)
+			if comp is None:
+				return None
+			js = comp.get_js_value()
+			if js is not None and comp.get_id() not in deps:
+				deps.append(comp.get_id())
+			return js
+		expr = fun(env)
+		if expr is None:
+			return None
+		else:
+			return (expr, deps)
 
 	def add_hidden(self, comp):
 		"""Add an hidden component (typically dialog or popup)."""
@@ -806,6 +988,13 @@ class Page(AbstractComponent):
 		out.write(f"var ui_page=\"{self.get_id()}\";\n")
 		for m in self.models:
 			m.gen_script(out)
+		self.gen_keys(out)
+
+	def gen_keys(self, out):
+		"""Generate the key table of the page."""
+		for comp in [self] + list(self.components.values()):
+			if comp.keys:
+				out.write(f"ui_keys[\"{comp.get_id()}\"] = {json.dumps(comp.get_key_map())};\n")
 
 	def gen_content(self, out):
 		"""Generate the content."""
@@ -818,29 +1007,91 @@ class Page(AbstractComponent):
 		"""Called to receive messages and answer. The answer is a
 		possibly list of back messages."""
 
-		# manage session
-		if self.session is not None:
-			self.session.update()
+		self.thread = current_thread()
+		job.CURRENT.page = self
+		try:
 
-		# manage messages
-		for m in msg:
-			id = m["id"]
-			if id == "0":
-				self.manage(m, handler)
-			else:
-				try:
-					comp = self.components[id]
-				except KeyError:
-					handler.log_error(f"unknown component in {m}")
-					comp = None
-				if comp is not None:
-					comp.receive(m, handler)
+			# manage session
+			if self.session is not None:
+				self.session.update()
+
+			# manage messages
+			self.flush()
+			for m in msg:
+				id = m["id"]
+				if id == "0":
+					self.manage(m, handler)
+				else:
+					try:
+						comp = self.components[id]
+					except KeyError:
+						handler.log_error(f"unknown component in {m}")
+						comp = None
+					if comp is not None:
+						comp.receive(m, handler)
+			self.flush()
+
+		finally:
+			self.thread = None
+			job.CURRENT.page = None
 
 		# manage answers
-		res = self.messages
-		self.messages = []
+		with self.lock:
+			res = self.messages
+			self.messages = []
 		return res
 
+	def post(self, fun, *args):
+		"""Call fun with args to update the page, its components or its
+		variables. This function can be called from any thread: if the
+		page is not currently processing a request in the calling thread,
+		the call is queued and performed (in order) by the thread serving
+		the page at its next request, the resulting messages being sent in
+		the answer (see start_polling()). For example, a background thread
+		changing the variable var calls:
+		```
+		page.post(var.set, value)
+		```"""
+		if self.thread is current_thread():
+			fun(*args)
+		else:
+			self.posted.append((fun, args))
+
+	def start_polling(self):
+		"""Make the client send a request every POLL_PERIOD ms, so that the
+		calls posted by other threads (see post()) are performed and their
+		messages displayed without waiting for a user action. The polling
+		lasts until stop_polling() is called as many times. It is started
+		by the background jobs (see run_background()) and the coroutine
+		handlers until their end."""
+		self.polling += 1
+		if self.polling == 1:
+			self.call("ui_poll_start", {"period": POLL_PERIOD})
+
+	def stop_polling(self):
+		"""Stop a polling started by start_polling()."""
+		self.polling -= 1
+		if self.polling == 0:
+			self.call("ui_poll_stop")
+
+	def run_background(self, fun, *args, executor="thread", **kwds):
+		"""Run the function fun with a orchid.job.Progress object and the
+		given arguments in background and return its orchid.job.Job handle.
+		executor may be "thread" or "process" (fun and its arguments must
+		then be picklable). The other keyword arguments are passed to the
+		Job (interface, message, on_done, on_error, period)."""
+		return job.Job(self, fun, args, executor=executor, **kwds)
+
+	def flush(self):
+		"""Perform the calls queued by post(). The changes of variables are
+		batched (see orchid.mind.batch()) so that only the last value of a
+		variable updated several times is sent."""
+		if self.posted:
+			with batch():
+				while self.posted:
+					(fun, args) = self.posted.popleft()
+					fun(*args)
+
 	def close(self):
 		"""Called to close the page."""
 		self.send({"type": "quit"})
@@ -869,6 +1120,17 @@ class Page(AbstractComponent):
 	def on_show(self):
 		self.main.on_show()
 
+	def release(self):
+		"""Called when the page is released (closed or its session expired)
+		to hide its shown components: they stop observing the variables,
+		models and actions, that may live longer than the page."""
+		self.is_online = False
+		if self.main.is_shown():
+			self.main.on_hide()
+		for comp in self.hidden:
+			if comp.is_shown():
+				comp.on_hide()
+
 	def manage(self, msg, handler):
 		"""Manage window messages."""
 
@@ -881,7 +1143,7 @@ class Page(AbstractComponent):
 		a = msg["action"]
 		if a == "close":
 			self.on_close()
-		elif a == "hi":
+		elif a == "hi" or a == "poll":
 			pass
 		elif a == "focus":
 			self.focus_id = msg["target"]
@@ -913,7 +1175,7 @@ class Page(AbstractComponent):
 	def open(self, page):
 		"""Change page to the given page."""
 		self.manager.add_page(page)
-		self.page.messages.append({
+		self.send({
 			"type": "call",
 			"fun": "ui_open",
 			"args": f"/_/{page.get_id()}"
@@ -930,9 +1192,11 @@ class Page(AbstractComponent):
 
 	def send(self, msg):
 		"""Send a message to the UI."""
-		self.messages.append(msg)
+		with self.lock:
+			self.messages.append(msg)
 
 	def gen(self, out):
+		self.flush()
 		for obs in self.filter_observers(PageObserver):
 			obs.on_open(self)
 		self.main.on_show()
@@ -1139,6 +1403,7 @@ class Application:
 		self.theme = theme
 		self.config = {}
 		self.first_class = first
+		self.pool = None
 		if session is None:
 			session = Session
 		self.session_cons = session
@@ -1160,6 +1425,20 @@ class Application:
 
 	def first(self):
 		"""Get the first page."""
+		if self.pool is not None:
+			return self.pool.take()
+		else:
+			return self.make_first()
+
+	def clear_pool(self):
+		"""Discard the index pages built in advance (see configuration item
+		page_pool of run()). To call when data read at the construction of
+		the first page changes."""
+		if self.pool is not None:
+			self.pool.clear()
+
+	def make_first(self):
+		"""Build a new first page."""
 		return self.first_class(self)
 
 	def new_session(self, man):
@@ -1251,7 +1530,7 @@ class Timer(Component):
 		if msg["action"] == "trigger":
 			if self.period == 0:
 				self.started = False
-			self.trigger()
+			job.call(self.trigger)
 		else:
 			Component.receive(self, msg, handler)
 
@@ -1302,3 +1581,16 @@ class Theme(Model):
 		"""Get the icon for a dialog. type must be one of MessageType
 		enumeration value. May return None if the type is not supported."""
 		return None
+
+
+THEMES = {}
+
+def get_theme(name):
+	"""Get the instance of the theme with the given name. The themes are
+	created once and shared by all pages."""
+	try:
+		return THEMES[name]
+	except KeyError:
+		theme = importlib.import_module(f"orchid.themes.{name}").get()
+		THEMES[name] = theme
+		return theme
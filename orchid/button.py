@@ -17,11 +17,13 @@
 
 """Button class."""
 
+from orchid import job
 from orchid.base import Component, Model
 from orchid.mind import AbstractAction, EnableObserver, Var, Types, \
 	EnumType, EntityObserver
 from orchid.field import LabelledField
 from orchid.image import Image
+from orchid.template import Template
 from orchid.util import Buffer, Context
 
 
@@ -38,7 +40,7 @@ class ButtonAction(AbstractAction):
 
 	def perform(self, interface):
 		if self.on_click is not None:
-			self.on_click()
+			job.call(self.on_click)
 
 
 class AbstractButton(Component, EnableObserver, EntityObserver):
@@ -55,6 +57,7 @@ class AbstractButton(Component, EnableObserver, EntityObserver):
 				None,
 				help=help
 			)
+		self.client_enable = False
 		if not enabled:
 			self.disable()
 
@@ -69,16 +72,36 @@ class AbstractButton(Component, EnableObserver, EntityObserver):
 		self.action.add_enable_observer(self)
 		if not self.action.is_enabled():
 			self.set_attr("disabled", None)
+		self.make_client_enable()
 
 	def on_hide(self):
 		Component.on_hide(self)
 		self.action.remove_enable_observer(self)
+		if self.client_enable:
+			self.client_enable = False
+			self.call("ui_set_pred", {"id": self.get_id(), "expr": None})
+
+	def make_client_enable(self):
+		"""If possible, let the client evaluates the enabling condition of
+		the action. In this case, the enable/disable state is no more sent
+		by the server (the action remains checked at click time)."""
+		res = self.page.compile_js(self.action.get_enable_js)
+		self.client_enable = res is not None
+		if self.client_enable:
+			expr, deps = res
+			self.call("ui_set_pred", {"id": self.get_id(), "expr": expr, "deps": deps})
 
 	def enable(self):
-		self.remove_attr("disabled")
+		if self.client_enable:
+			self.remove_attr_async("disabled")
+		else:
+			self.remove_attr("disabled")
 
 	def disable(self):
-		self.set_attr("disabled", None)
+		if self.client_enable:
+			self.set_attr_async("disabled", None)
+		else:
+			self.set_attr("disabled", None)
 
 	def is_enabled(self):
 		return self.action.is_enabled()
@@ -100,6 +123,7 @@ class AbstractButton(Component, EnableObserver, EntityObserver):
 		self.action = action
 		if self.online():
 			self.action.add_enable_observer(self)
+			self.make_client_enable()
 			self.test_enabled()
 
 
@@ -143,7 +167,7 @@ class Button(AbstractButton):
 			), enabled=enabled)
 		if self.action.help is not None:
 			self.set_attr("title", self.action.help)
-		self.set_attr("onclick", f'ui_onclick("{self.get_id()}");')
+		self.set_event("click", "ui_on_click")
 
 	def finalize(self, page):
 		AbstractButton.finalize(self, page)
@@ -182,13 +206,10 @@ class Button(AbstractButton):
 		if self.action.label is not None:
 			out.write(f'<span class="label">{self.action.label}</span>')
 
+	TEMPLATE = Template('<button{gen_attrs}>{gen_content}</button>\n')
+
 	def gen(self, out):
-		out.write('<button')
-		self.gen_attrs(out)
-		out.write('>')
-		self.gen_content(out)
-		out.write('</button>')
-		out.write('\n')
+		self.TEMPLATE.gen(out, self)
 
 	def click(self):
 		"""Called when the button is clicked."""
@@ -209,12 +230,13 @@ class Button(AbstractButton):
 CHECK_BOX_MODEL = Model("check-box",
 	script=
 """
-function check_box_on_change(id, event) {
-	const comp = document.getElementById(id);
-	if(comp.checked)
-		ui_send({id: id, action: 'check'});
+function check_box_on_change(element, event) {
+	if(element !== event.target)
+		return;
+	if(element.checked)
+		ui_send({id: element.id, action: 'check'});
 	else
-		ui_send({id: id, action: 'uncheck'});
+		ui_send({id: element.id, action: 'uncheck'});
 }
 
 function check_box_set(args) {
@@ -235,8 +257,7 @@ class CheckBox(Component, LabelledField):
 		else:
 			self.var = Var(value, label=label, help=help)
 		self.set_value(value)
-		self.set_attr("onchange",
-			f"check_box_on_change('{self.get_id()}', event);")
+		self.set_event("change", "check_box_on_change")
 		self.enabled = True
 		self.set_enabled(enabled)
 		self.updating = False
@@ -334,8 +355,8 @@ class CheckBox(Component, LabelledField):
 RADIO_BUTTON_MODEL = Model("radio-button",
 	script =
 """
-function radio_button_on_change(id, event) {
-	ui_send({id: id, action: "choose", choice: event.target.value});
+function radio_button_on_change(element, event) {
+	ui_send({id: element.id, action: "choose", choice: event.target.value});
 }
 
 function radio_button_set(msg) {
@@ -362,6 +383,7 @@ class RadioButton(Component, LabelledField):
 		assert 0 <= choice < len(self.options)
 		self.horizontal = horizontal
 		self.updating = False
+		self.set_event("change", "radio_button_on_change")
 
 	def take_focus(self):
 		self.grab_focus()
@@ -406,7 +428,9 @@ class RadioButton(Component, LabelledField):
 			out.write('</label>')
 
 	def gen_field(self, out, with_label=True):
-		out.write(f'<form onchange="radio_button_on_change(\'{self.get_id()}\', event);">')
+		out.write('<form')
+		self.gen_attrs(out)
+		out.write('>')
 		for i, _ in enumerate(self.options):
 			if i != 0 and not self.horizontal:
 				out.write('<br/>')
@@ -24,6 +24,7 @@ from orchid.button import Button
 from orchid.label import Label
 from orchid.group import VGroup, HGroup, Spring
 from orchid.image import AssetImage
+from orchid.template import Template
 from orchid.util import Align
 
 MODEL = Model(
@@ -64,11 +65,17 @@ class Base(Component):
 		self.no_pad = no_pad
 		self.interface = None
 		self.content = None
+		self.ready = False
 		page.add_hidden(self)
 
-	def finalize(self, page):
-		Component.finalize(self, page)
-		self.main.finalize(page)
+	def prepare(self):
+		"""Finalize and generate the content of the dialog the first time
+		it is shown."""
+		if not self.ready:
+			self.ready = True
+			self.get_content().finalize(self.page)
+			if self.online():
+				self.set_content(self.get_content())
 
 	def get_content(self):
 		"""Get the content of the dialog."""
@@ -92,19 +99,24 @@ class Base(Component):
 		self.content = None
 		self.get_content()
 		self.main.parent = self
-		if self.online():
-			self.main.finalize(self.get_page())
-			self.set_content(self.get_content())
+		if self.ready:
+			self.get_content().finalize(self.get_page())
+			if self.online():
+				self.set_content(self.get_content())
+
+	TEMPLATE = Template('<dialog{gen_attrs}>{gen_content}</dialog>')
+
+	def gen_content(self, out):
+		"""Generate the content of the dialog (if already shown)."""
+		if self.ready:
+			self.get_content().gen(out)
 
 	def gen(self, out):
-		out.write('<dialog')
-		self.gen_attrs(out)
-		out.write('>')
-		self.get_content().gen(out)
-		out.write('</dialog>')
+		self.TEMPLATE.gen(out, self)
 
 	def show(self):
 		if not self.shown:
+			self.prepare()
 			self.shown = True
 			self.call("dialog_show", {"id": self.get_id()})
 			self.on_show()
@@ -156,6 +168,10 @@ ANSWER_MODEL = Model(
 function dialog_answer_choose(id, n) {
 	ui_send({ id: id, action: "choose", n: n });
 }
+
+function dialog_answer_on_click(element, event) {
+	dialog_answer_choose(element.closest("dialog").id, parseInt(element.dataset.answer));
+}
 """
 )
 
@@ -205,7 +221,8 @@ class Answer(Base):
 
 		# capture button click
 		for (n, button) in enumerate(self.buttons):
-			button.set_attr('onclick', f'dialog_answer_choose("{self.get_id()}", {n});')
+			button.set_attr("data-answer", n)
+			button.set_event("click", "dialog_answer_on_click")
 
 	def select(self, n):
 		"""Called when a button number n is choosed/"""
@@ -0,0 +1,219 @@
+#
+#	This file is part of Orchid.
+#
+#    Orchid is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Lesser General Public License as
+#	published by the Free Software Foundation, either version 3 of the
+#	License, or (at your option) any later version.
+#
+#	Orchid is distributed in the hope that it will be useful, but
+#	WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#	GNU Lesser General Public License for more details.
+#
+#	You should have received a copy of the GNU Lesser General Public
+#	License along with Orchid. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Structural difference between HTML fragments producing the patch
+operations applied by orchid.js (function ui_patch())."""
+
+from difflib import SequenceMatcher
+import html
+from html.parser import HTMLParser
+
+VOID_TAGS = {
+	"area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+	"meta", "source", "track", "wbr"
+}
+
+TEXT = "#text"
+COMMENT = "#comment"
+
+
+class Node:
+	"""Node of a parsed HTML fragment: an element (with tag, attributes and
+	children), a text (tag is TEXT) or a comment (tag is COMMENT)."""
+
+	def __init__(self, tag, attrs=None, text=""):
+		self.tag = tag
+		self.attrs = attrs
+		self.text = text
+		self.children = []
+		self.html = None
+
+	def get_id(self):
+		"""Get the identifier of the element or None."""
+		return None if self.attrs is None else self.attrs.get("id")
+
+	def to_html(self):
+		"""Get the HTML text of the node."""
+		if self.html is None:
+			if self.tag == TEXT:
+				self.html = self.text
+			elif self.tag == COMMENT:
+				self.html = f"<!--{self.text}-->"
+			else:
+				text = [f"<{self.tag}"]
+				for (att, val) in self.attrs.items():
+					if val is None:
+						text.append(f" {att}")
+					else:
+						text.append(f' {att}="{html.escape(val, quote=True)}"')
+				text.append(">")
+				if self.tag not in VOID_TAGS:
+					for child in self.children:
+						text.append(child.to_html())
+					text.append(f"</{self.tag}>")
+				self.html = "".join(text)
+		return self.html
+
+
+class Parser(HTMLParser):
+	"""Parser building the tree of a fragment as the browser would do for
+	the HTML produced by Orchid components."""
+
+	def __init__(self):
+		HTMLParser.__init__(self, convert_charrefs=False)
+		self.root = Node(None, {})
+		self.stack = [self.root]
+
+	def add(self, node):
+		self.stack[-1].children.append(node)
+
+	def handle_starttag(self, tag, attrs):
+		if tag == "tr" and self.stack[-1].tag == "table":
+			self.handle_starttag("tbody", [])
+		node = Node(tag, dict(attrs))
+		self.add(node)
+		if tag not in VOID_TAGS:
+			self.stack.append(node)
+
+	def handle_startendtag(self, tag, attrs):
+		# "/>" does not close non-void elements in HTML
+		self.handle_starttag(tag, attrs)
+
+	def handle_endtag(self, tag):
+		for i in range(len(self.stack) - 1, 0, -1):
+			if self.stack[i].tag == tag:
+				del self.stack[i:]
+				break
+
+	def handle_data(self, data):
+		parent = self.stack[-1]
+		if parent.children and parent.children[-1].tag == TEXT:
+			parent.children[-1].text += data
+		else:
+			self.add(Node(TEXT, text=data))
+
+	def handle_comment(self, data):
+		self.add(Node(COMMENT, text=data))
+
+	def handle_entityref(self, name):
+		self.handle_data(f"&{name};")
+
+	def handle_charref(self, name):
+		self.handle_data(f"&#{name};")
+
+
+def parse(text):
+	"""Parse the HTML text and return the root node (whose children are
+	the nodes of the fragment)."""
+	parser = Parser()
+	parser.feed(text)
+	parser.close()
+	return parser.root
+
+
+def same_kind(old, new):
+	"""Test if the new node can be obtained by patching the old one."""
+	return old.tag == new.tag and old.get_id() == new.get_id()
+
+
+def diff_node(old, new, path, ops):
+	"""Add to ops the operations to turn the old node at the given path
+	into the new node."""
+	if old.tag == TEXT:
+		if old.text != new.text:
+			ops.append({"op": "text", "path": path, "tag": TEXT,
+				"text": html.unescape(new.text)})
+		return
+	if old.tag == COMMENT:
+		if old.text != new.text:
+			ops.append({"op": "replace", "path": path, "tag": COMMENT,
+				"html": new.to_html()})
+		return
+	for (att, val) in new.attrs.items():
+		if att not in old.attrs or old.attrs[att] != val:
+			ops.append({"op": "set-attr", "path": path, "tag": old.tag,
+				"attr": att, "val": "" if val is None else val})
+	for att in old.attrs:
+		if att not in new.attrs:
+			ops.append({"op": "remove-attr", "path": path, "tag": old.tag,
+				"attr": att})
+	diff_children(old, new, path, ops)
+
+
+def diff_children(old, new, path, ops):
+	"""Add to ops the operations to turn the children of old node into
+	the children of new node."""
+	olds = old.children
+	news = new.children
+
+	# skip common prefix and suffix
+	p = 0
+	n = min(len(olds), len(news))
+	while p < n and olds[p].to_html() == news[p].to_html():
+		p += 1
+	s = 0
+	while s < n - p and olds[-1-s].to_html() == news[-1-s].to_html():
+		s += 1
+	olds = olds[p:len(olds)-s]
+	news = news[p:len(news)-s]
+
+	# one node changed: patch it
+	if len(olds) == 1 and len(news) == 1:
+		diff_range(olds, news, p, path, ops)
+
+	# else align the nodes, processed from the end to keep positions valid
+	elif olds or news:
+		matcher = SequenceMatcher(None,
+			[o.to_html() for o in olds], [n.to_html() for n in news])
+		for (tag, i1, i2, j1, j2) in reversed(matcher.get_opcodes()):
+			if tag == "equal":
+				continue
+			if i2 - i1 == j2 - j1:
+				diff_range(olds[i1:i2], news[j1:j2], p + i1, path, ops)
+			else:
+				for i in range(i2 - 1, i1 - 1, -1):
+					ops.append({"op": "remove", "path": path, "tag": old.tag,
+						"pos": p + i})
+				for j in range(j1, j2):
+					ops.append({"op": "insert", "path": path, "tag": old.tag,
+						"pos": p + i1 + j - j1, "html": news[j].to_html()})
+
+
+def diff_range(olds, news, pos, path, ops):
+	"""Add to ops the operations to turn each node of olds, starting at
+	position pos, into the node of news with the same index."""
+	for (i, (o, n)) in enumerate(zip(olds, news)):
+		if same_kind(o, n):
+			diff_node(o, n, path + [pos + i], ops)
+		else:
+			ops.append({"op": "replace", "path": path + [pos + i],
+				"tag": o.tag, "html": n.to_html()})
+
+
+def diff(old, new):
+	"""Compute the operations to turn the content of an element from old to
+	new (both trees returned by parse()). The paths of operations are lists
+	of child node indexes from the element."""
+	ops = []
+	diff_children(old, new, [], ops)
+	return ops
+
+
+def ops_size(ops):
+	"""Estimate the size of the operations once sent."""
+	return sum(48 + len(op.get("html", "")) + len(op.get("text", ""))
+		+ len(op.get("val", "")) for op in ops)
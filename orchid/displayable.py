@@ -24,6 +24,7 @@ import re
 class Displayable:
 	"""Defines an object that may be displayed in the UI but is not
 	interactive. It may be finalized and generated."""
+	version = 0
 
 	def finalize(self, page):
 		"""Called before the generation in order to link with the page
@@ -36,6 +37,12 @@ class Displayable:
 		The default implementation does nothing."""
 		pass
 
+	def is_cacheable(self):
+		"""Test if the generated HTML can be kept until the version of the
+		displayable changes. Default implementation returns True as
+		displayables are not modified."""
+		return True
+
 DISPLAY_NONE = Displayable()
 """Displayable that displays nothing."""
 
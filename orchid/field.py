@@ -17,12 +17,17 @@
 
 """Field components."""
 
+from bisect import bisect_left
+from enum import Enum
+from functools import lru_cache
+import json
 import re
 from orchid.base import Component, Model
 from orchid.util import Buffer, Align
 from orchid.group import VGroup, Group
 from orchid.label import Label
-from orchid.mind import Var, EnumType, Type, Types
+from orchid.template import Template
+from orchid.mind import Var, EnumType, RangeType, Type, Types, regex_to_js
 
 
 class LabelledField:
@@ -44,9 +49,102 @@ function field_change(id, value) {
 	ui_send({id: id, action: "change", value: value});
 }
 
+var field_res = new Map();
+
+function field_check(input) {
+	const check = JSON.parse(input.dataset.check);
+	const text = input.value;
+	if(text == "")
+		return true;
+	if(check.pattern != undefined) {
+		let re = field_res.get(check.pattern);
+		if(re == undefined) {
+			re = new RegExp(`^(?:${check.pattern})$`);
+			field_res.set(check.pattern, re);
+		}
+		if(!re.test(text))
+			return false;
+	}
+	const length = [...text].length;
+	if(check.minlength != undefined && length < check.minlength)
+		return false;
+	if(check.maxlength != undefined && length > check.maxlength)
+		return false;
+	if(check.type != undefined) {
+		const value = field_value(input.id, check.type);
+		if(value == null)
+			return false;
+		if(check.min != undefined && value < check.min)
+			return false;
+		if(check.max != undefined && value > check.max)
+			return false;
+	}
+	return true;
+}
+
+function field_mark(field, input) {
+	if(input.dataset.check == undefined)
+		return;
+	const valid = field_check(input);
+	field.classList.toggle("valid", valid);
+	field.classList.toggle("invalid", !valid);
+}
+
+var field_pending = new Map();
+
+function field_sync(element) {
+	const form = element.closest("[data-sync]");
+	return form == null ? ["input", null] : [form.dataset.sync, form.id];
+}
+
+function field_on_input(element, event) {
+	const [sync, form] = field_sync(element);
+	if(sync == "input")
+		field_change(element.id, event.target.value);
+	else if(sync == "submit") {
+		if(!field_pending.has(form))
+			field_pending.set(form, {});
+		field_pending.get(form)[element.id] = event.target.value;
+	}
+	field_mark(element, event.target);
+	ui_check_preds(element.id);
+}
+
+function field_on_change(element, event) {
+	if(field_sync(element)[0] == "change")
+		field_change(element.id, event.target.value);
+}
+
+function field_flush() {
+	if(field_pending.size == 0
+	|| ui_messages.every((m) => m.action == "focus"))
+		return;
+	for(const [form, values] of field_pending)
+		ui_messages.unshift({id: form, action: "submit", values: values});
+	field_pending.clear();
+}
+
+ui_before_send.push(field_flush);
+
 function field_set(args) {
-	let field = window.document.getElementById(args.id);
-	field.value = args.value;
+	let input = window.document.getElementById(args.id);
+	input.value = args.value;
+	const field = input.closest(".field");
+	field_mark(field, input);
+	ui_check_preds(field.id);
+}
+
+function field_value(id, type) {
+	const text = document.getElementById(id).value;
+	if(text == "")
+		return null;
+	else if(type == "int")
+		return /^\\s*[+-]?\\d+\\s*$/.test(text) ? Number(text) : null;
+	else if(type == "float")
+		return /^\\s*[+-]?(\\d+\\.?\\d*|\\.\\d+)([eE][+-]?\\d+)?\\s*$/.test(text)
+			? Number(text) : null;
+	else
+		return text;
 }
 """,
 	style = """
@@ -64,6 +162,33 @@ div.field input {
 )
 
 
+def accept(x):
+	"""Default validation function accepting any value."""
+	return True
+
+
+JS_TYPES = {
+	Types.INT: "int",
+	Types.FLOAT: "float",
+	Types.STR: "str"
+}
+
+# numbers accepted by the browser (function field_value())
+JS_NUMBERS = {
+	"int": re.compile(r"\s*[+-]?\d+\s*", re.ASCII),
+	"float": re.compile(r"\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*", re.ASCII)
+}
+
+
+def constrain(fun, **constraints):
+	"""Attach to a parse or validate function the constraints allowing the
+	browser to perform the same check. The supported constraints are pattern
+	(Javascript regular expression), minlength, maxlength, type ("int" or
+	"float"), min and max (applying to parsed numbers). Return fun."""
+	fun.constraints = constraints
+	return fun
+
+
 class WrapType(Type):
 	"""Wrap type to support convert and validate functions of fields."""
 
@@ -105,7 +230,9 @@ class Field(Component, LabelledField):
 	* as_text - transform the value into string.
 	* parse - parse the value in string or return None if there is an error.
 
-	Convenient validating functions: is_valid_natural(), is_valid_re()."""
+	Convenient parsing functions: as_natural(), as_re(), as_length(). When
+	the parse and validate functions are known by the browser (see
+	constrain()), the validity is marked locally without server round-trip."""
 
 	def __init__(self,
 		label = None,
@@ -117,7 +244,7 @@ class Field(Component, LabelledField):
 		help = None,
 		enabled = True,
 		model = FIELD_MODEL,
-		validate = lambda x: True,
+		validate = accept,
 		as_text = None,
 		parse = None,
 		var = None
@@ -142,8 +269,11 @@ class Field(Component, LabelledField):
 
 		# internal state
 		self.validate = validate
+		self.client_check = self.get_client_check()
 		self.valid = None
 		self.add_class("field")
+		self.set_event("input", "field_on_input")
+		self.set_event("change", "field_on_change")
 		self.check(self.var.get())
 		self.enabled = None
 		self.set_enabled(enabled)
@@ -172,6 +302,46 @@ class Field(Component, LabelledField):
 		"""Get the variable containing the value of the field."""
 		return self.var
 
+	def finalize(self, page):
+		Component.finalize(self, page)
+		page.bind(self.var, self)
+
+	def get_client_check(self):
+		"""Get the constraints checked by the browser to mark locally the
+		validity of the field or None if the validation requires the server."""
+		check = {}
+		type = self.var.get_type()
+		if isinstance(type, WrapType) and type.parse_fun is not None:
+			constraints = getattr(type.parse_fun, "constraints", None)
+			if constraints is None:
+				return None
+			check.update(constraints)
+		else:
+			if isinstance(type, WrapType):
+				type = type.type
+			if isinstance(type, RangeType):
+				check.update(type="int", min=type.min, max=type.max)
+			elif type in JS_TYPES:
+				if type is not Types.STR:
+					check["type"] = JS_TYPES[type]
+			else:
+				return None
+		if self.validate is not accept:
+			constraints = getattr(self.validate, "constraints", None)
+			if constraints is None:
+				return None
+			check.update(constraints)
+		return check
+
+	def get_js_value(self):
+		if self.validate is not accept:
+			return None
+		try:
+			type = JS_TYPES[self.var.get_type()]
+		except KeyError:
+			return None
+		return f'field_value("{self.get_id()}-field", "{type}")'
+
 	def is_enabled(self):
 		"""Test if the field is enabled."""
 		return self.enabled
@@ -250,45 +420,67 @@ class Field(Component, LabelledField):
 		if self.var.help is not None:
 			self.gen_attr(out, "title", self.var.help)
 		self.gen_custom(out)
+		if self.client_check:
+			self.gen_attr(out, "data-check", json.dumps(self.client_check))
 		if ~self.var is not None:
 			self.gen_attr(out, "value", self.var.get_type().as_text(~self.var))
-		self.gen_attr(out, "oninput", f'field_change("{self.get_id()}", this.value);')
 
 	def gen_label(self, out):
 		"""Generate label for the field."""
 		if self.var.label is not None:
 			out.write(f'<label for="{self.get_id()}-field">{self.var.label}</label>')
 
+	INPUT_TEMPLATE = Template(
+		'<input id="{get_id!s}-field"{gen_input_attrs}>{gen_custom_content}</input>')
+	FIELD_TEMPLATE = Template('<div {gen_attrs}>{gen_label}{gen_input}</div>')
+	UNLABELLED_TEMPLATE = Template('<div {gen_attrs}>{gen_input}</div>')
+
 	def gen_input(self, out):
 		"""Generate the <input> tag."""
-		out.write(f'<input id="{self.get_id()}-field"')
-		self.gen_input_attrs(out)
-		out.write('>')
-		self.gen_custom_content(out)
-		out.write('</input>')
+		self.INPUT_TEMPLATE.gen(out, self)
 
 	def gen_field(self, out, with_label=True):
-		out.write("<div ")
-		self.gen_attrs(out)
-		out.write(">")
 		if with_label and self.place_holder is not True:
-			self.gen_label(out)
-		self.gen_input(out)
-		out.write("</div>")
+			self.FIELD_TEMPLATE.gen(out, self)
+		else:
+			self.UNLABELLED_TEMPLATE.gen(out, self)
 
 	def gen(self, out):
 		self.gen_field(out)
 
-	def set_validity(self, valid):
-		"""Mark the field as valid or invalid."""
-		if self.valid != valid:
+	def is_client_valid(self, text, valid):
+		"""Get the validity of text as marked by the browser for a field
+		checked by the browser when the server finds it valid or not."""
+		type = self.client_check.get("type")
+		if isinstance(text, str) and text and type is not None \
+		and JS_NUMBERS[type].fullmatch(text) is None:
+			return False
+		else:
+			return valid
+
+	def set_validity(self, valid, text=None):
+		"""Mark the field as valid or invalid. If the field is checked by the
+		browser, the remote page is not notified unless the browser marked
+		the typed text (if given) differently."""
+		if valid:
+			(old, new) = ("invalid", "valid")
+		else:
+			(old, new) = ("valid", "invalid")
+		if not self.client_check:
+			if self.valid != valid:
+				self.valid = valid
+				self.remove_class(old)
+				self.add_class(new)
+		elif text is not None and self.is_client_valid(text, valid) != valid:
 			self.valid = valid
-			if valid:
-				self.remove_class("invalid")
-				self.add_class("valid")
-			else:
-				self.remove_class("valid")
-				self.add_class("invalid")
+			self.remove_class_async(old)
+			self.add_class_async(new)
+			self.remove_class(old, id=self.get_id())
+			self.add_class(new, id=self.get_id())
+		elif self.valid != valid:
+			self.valid = valid
+			self.remove_class_async(old)
+			self.add_class_async(new)
 
 	def is_valid(self):
 		"""Test if the field is valid or invalid."""
@@ -298,23 +490,26 @@ class Field(Component, LabelledField):
 		"""Check the current value."""
 		if content is None or content == "":
 			self.var.set(None)
-			self.set_validity(True)
+			self.set_validity(True, content)
 			return
 		value = self.var.get_type().parse(content)
 		if value is None or not self.validate(value):
 			self.var.set(None)
-			self.set_validity(False)
+			self.set_validity(False, content)
 		else:
 			if ~self.var != value:
 				self.record_var(value)
-			self.set_validity(True)
+			self.set_validity(True, content)
+
+	def commit(self, content):
+		"""Record the content typed by the user in the field."""
+		self.updating = True
+		self.check(content)
+		self.updating = False
 
 	def receive(self, msg, handler):
 		if msg["action"] == "change":
-			self.updating = True
-			content = msg["value"]
-			self.check(content)
-			self.updating = False
+			self.commit(msg["value"])
 		else:
 			Component.receive(self, msg, handler)
 
@@ -413,8 +608,8 @@ function select_choose(m) {
 	comp.selectedIndex = m.id;
 }
 
-function select_on_choose(elt) {
-	ui_send({id: elt.id, action: "choose", idx: elt.selectedIndex });
+function select_on_choose(element, event) {
+	ui_send({id: element.id, action: "choose", idx: element.selectedIndex });
 }
 """
 	)
@@ -445,7 +640,7 @@ class Select(Component, LabelledField):
 		self.enabled = None
 		self.set_enabled(enabled)
 		self.size = size
-		self.set_attr("onchange", 'select_on_choose(this);')
+		self.set_event("change", "select_on_choose")
 		self.updating = False
 
 	def on_show(self):
@@ -503,23 +698,27 @@ class Select(Component, LabelledField):
 		if not self.updating:
 			self.update_remote()
 
+	FIELD_TEMPLATE = Template(
+		'<div>{gen_label}<select{gen_attrs} name="{get_id!s}"{gen_help}>'
+		'{gen_options}</select></div>')
+	UNLABELLED_TEMPLATE = Template(
+		'<div><select{gen_attrs} name="{get_id!s}"{gen_help}>'
+		'{gen_options}</select></div>')
+
 	def gen_label(self, out):
 		if self.var.label is not None:
 			out.write(f'<label for="{self.get_id()}">{self.var.label}</label>')
 
-	def gen_field(self, out, with_label=True):
-		out.write("<div>")
-		if with_label:
-			self.gen_label(out)
-		out.write('<select')
-		self.gen_attrs(out)
-		out.write(f' name="{self.get_id()}"')
+	def gen_help(self, out):
+		"""Generate the help attribute, if any."""
 		if self.var.help is not None:
 			self.gen_attr(out, "title", self.var.help)
-		out.write('>')
-		self.gen_options(out)
-		out.write('</select>')
-		out.write("</div>")
+
+	def gen_field(self, out, with_label=True):
+		if with_label:
+			self.FIELD_TEMPLATE.gen(out, self)
+		else:
+			self.UNLABELLED_TEMPLATE.gen(out, self)
 
 	def gen(self, out):
 		self.gen_field(out)
@@ -606,9 +805,29 @@ function proposal_show(m) {
 	proposal_pos = null;
 }
 
-function proposal_on_key_down(evt) {
-	//console.log("Key = " + evt.key);
-	if(evt.key == "ArrowDown") {
+var proposal_timers = new Map();
+
+function proposal_on_input(element, event) {
+	const delay = Number(element.dataset.debounce);
+	if(!delay) {
+		field_on_input(element, event);
+		return;
+	}
+	const input = event.target;
+	clearTimeout(proposal_timers.get(element.id));
+	proposal_timers.set(element.id, setTimeout(() => {
+		proposal_timers.delete(element.id);
+		field_on_input(element, {target: input});
+	}, delay));
+}
+
+function proposal_on_focus_out(element, event) {
+	proposal_hide();
+}
+
+function proposal_on_key_down(element, event) {
+	//console.log("Key = " + event.key);
+	if(event.key == "ArrowDown") {
 		if(proposal_pos != null) {
 			proposal_pos.classList.remove("proposal-selected");
 			proposal_pos = proposal_pos.nextElementSibling;
@@ -619,7 +838,7 @@ function proposal_on_key_down(evt) {
 		event.stopPropagation();
 		event.preventDefault();
 	}
-	else if(evt.key == "ArrowUp") {
+	else if(event.key == "ArrowUp") {
 		if(proposal_pos != null) {
 			proposal_pos.classList.remove("proposal-selected");
 			proposal_pos = proposal_pos.previousElementSibling;
@@ -630,13 +849,13 @@ function proposal_on_key_down(evt) {
 		event.stopPropagation();
 		event.preventDefault();
 	}
-	else if(evt.key == "Enter" && proposal_pos != null) {
+	else if(event.key == "Enter" && proposal_pos != null) {
 		let value = proposal_pos.innerHTML;
 		proposal_input.value = value;
 		proposal_hide();
 		ui_send({id: proposal_id, action: "select", value: value});
 	}
-	else if(evt.key == "Escape") {
+	else if(event.key == "Escape") {
 		proposal_hide();
 		event.stopPropagation();
 		event.preventDefault();
@@ -645,20 +864,86 @@ function proposal_on_key_down(evt) {
 """
 )
 
+class Corpus:
+	"""Proposal function looking up candidates in a fixed collection of
+	strings. The candidates starting with the looked text are found by
+	dichotomy in the sorted collection and, for texts of at least 3
+	characters, the candidates containing the text are found using a
+	trigram index. At most top candidates are returned (the ones starting
+	with the text first) and the results of the last cache lookups are
+	kept."""
+
+	def __init__(self, items, top=10, cache=128, ignore_case=False):
+		self.top = top
+		self.ignore_case = ignore_case
+		self.items = sorted(set(items), key=self.fold)
+		self.keys = [self.fold(item) for item in self.items]
+		self.index = {}
+		for (i, key) in enumerate(self.keys):
+			for tri in {key[j:j+3] for j in range(len(key) - 2)}:
+				try:
+					self.index[tri].append(i)
+				except KeyError:
+					self.index[tri] = [i]
+		self.lookup = lru_cache(maxsize=cache)(self.lookup)
+
+	def fold(self, text):
+		"""Get the text used to compare with looked texts."""
+		return text.casefold() if self.ignore_case else text
+
+	def lookup(self, text):
+		"""Look for the candidates matching the text. Return a tuple of
+		indexes in the items."""
+		key = self.fold(text)
+		res = []
+		i = bisect_left(self.keys, key)
+		while i < len(self.keys) and len(res) < self.top \
+		and self.keys[i].startswith(key):
+			res.append(i)
+			i += 1
+		if len(res) < self.top and len(key) >= 3:
+			prefixed = set(res)
+			postings = min(
+				(self.index.get(key[j:j+3], []) for j in range(len(key) - 2)),
+				key=len)
+			for i in postings:
+				if i not in prefixed and key in self.keys[i]:
+					res.append(i)
+					if len(res) >= self.top:
+						break
+		return tuple(res)
+
+	def __call__(self, text):
+		return [self.items[i] for i in self.lookup(text)]
+
+
 class ProposalField(Field):
 	"""Like a field but also with the possibility to provides, with a menu,
 	proposals to the user to shorten the typing effort. The propose function
 	takes as input the current content of the field and returns a list of
-	proposals as a list of strings."""
+	proposals as a list of strings.
+
+	Instead of propose, a corpus can be given as a collection of strings or
+	as a Corpus. debounce, in ms, delays the sending of the typed content
+	until the user stops typing."""
 
-	def __init__(self, propose = lambda x: [], **args):
+	def __init__(self, propose = lambda x: [], corpus = None, debounce = 0,
+	**args):
 		Field.__init__(self, model=PROPOSAL_MODEL, **args)
+		if corpus is not None:
+			propose = corpus if isinstance(corpus, Corpus) else Corpus(corpus)
 		self.propose = propose
 		self.prev = []
+		self.displayed = []
 		self.group = VGroup([], align=Align.JUSTIFY)
 		self.group.add_class("proposal-popup")
 		self.group.set_style("display", "none")
 		self.add_class("proposal-field")
+		self.set_event("input", "proposal_on_input")
+		self.set_event("focusout", "proposal_on_focus_out")
+		self.set_event("keydown", "proposal_on_key_down")
+		if debounce:
+			self.set_attr("data-debounce", debounce)
 
 	def gen_field(self, out, with_label=True):
 		out.write("<div ")
@@ -671,14 +956,9 @@ class ProposalField(Field):
 		self.group.gen(out)
 		out.write("</div></div>")
 
-	def gen_input_attrs(self, out):
-		Field.gen_input_attrs(self, out)
-		out.write(' onfocusout="proposal_hide();"')
-
 	def finalize(self, page):
 		Field.finalize(self, page)
 		self.group.finalize(page)
-		self.set_attr("onkeydown", 'proposal_on_key_down(event);')
 
 	def show_props(self):
 		self.call("proposal_show",
@@ -687,6 +967,19 @@ class ProposalField(Field):
 	def hide_props(self):
 		self.call("proposal_hide")
 
+	def set_props(self, props):
+		"""Change the displayed proposals, only updating the labels that
+		changed."""
+		labs = self.group.get_children()
+		for i in range(min(len(props), len(self.displayed))):
+			if props[i] != self.displayed[i]:
+				labs[i].set_text(props[i])
+		for i in range(len(self.displayed) - 1, len(props) - 1, -1):
+			self.group.remove(i)
+		for prop in props[len(self.displayed):]:
+			self.group.insert(Label(prop))
+		self.displayed = list(props)
+
 	def receive(self, msg, handler):
 		if msg["action"] == "change":
 			value = msg["value"]
@@ -700,8 +993,7 @@ class ProposalField(Field):
 					if props == [] or (len(props) == 1 and props[0] == value):
 						self.hide_props()
 					else:
-						labs = [Label(prop) for prop in props]
-						self.group.replace_children(labs)
+						self.set_props(props)
 						self.show_props()
 		elif msg["action"] == "select":
 			self.prev = []
@@ -717,13 +1009,28 @@ def as_natural(x):
 	except ValueError:
 		return None
 
+constrain(as_natural, type="int")
+
 def as_re(r):
 	"""Generate a function to test if the content match RE."""
 	cre = re.compile(r)
 	def check(x):
 		return x if cre.fullmatch(x) is not None else None
+	js = regex_to_js(r)
+	if js is not None:
+		constrain(check, pattern=js)
 	return check
 
+def as_length(min=0, max=None):
+	"""Generate a function to test if the content length is in [min, max]
+	(no upper bound if max is None)."""
+	def check(x):
+		return x if min <= len(x) and (max is None or len(x) <= max) else None
+	constraints = {"minlength": min}
+	if max is not None:
+		constraints["maxlength"] = max
+	return constrain(check, **constraints)
+
 
 FORM_MODEL = Model(
 	"form",
@@ -736,13 +1043,41 @@ table.form tr td:first-child {
 """
 )
 
+class Sync(Enum):
+	"""Policy used by the fields of a form to send their content to the
+	server."""
+	ON_INPUT = "input"
+	ON_CHANGE = "change"
+	ON_SUBMIT = "submit"
+
+
 class Form(Group):
 	"""A form is a list of fields with labels aligned for good looking.
-	Its component extends LabelledField."""
+	Its component extends LabelledField.
+
+	sync selects when the fields send their content to the server: at each
+	input (default), when the field is left or validated (Sync.ON_CHANGE) or
+	all at once when an action is fired (Sync.ON_SUBMIT). With deferred
+	synchronization, the variables of the fields are only updated at this
+	time."""
 
-	def __init__(self, fields):
+	def __init__(self, fields, sync=Sync.ON_INPUT):
 		Group.__init__(self, FORM_MODEL, fields)
 		self.add_class("form")
+		self.sync = sync
+		if sync is not Sync.ON_INPUT:
+			self.set_attr("data-sync", sync.value)
+
+	def receive(self, msg, handler):
+		if msg["action"] == "submit":
+			values = msg["values"]
+			for field in self.get_children():
+				try:
+					field.commit(values[field.get_id()])
+				except KeyError:
+					pass
+		else:
+			Group.receive(self, msg, handler)
 
 	def gen(self, out):
 		out.write("<table")
@@ -104,8 +104,9 @@ class Group(ParentComponent):
 	def remap_child(self, child):
 		self.check_remap()
 
-	def remove_children(self):
-		"""Remove all children of the group."""
+	def remove_children(self, clear=True):
+		"""Remove all children of the group. If clear is False, the remote
+		content is left as is (it is expected to be replaced)."""
 		if self.online() and self.is_shown():
 			for child in self.children:
 				if child.is_shown():
@@ -113,24 +114,34 @@ class Group(ParentComponent):
 		for child in self.children:
 			child.parent = None
 		self.children = []
+		self.invalidate()
 		self.remap_children()
-		if self.online():
+		if self.online() and clear:
 			self.clear_content()
 
+	def is_prepared(self):
+		"""Test if the children of the group are finalized and generated.
+		A child added to a group not prepared (not yet in a page or in a
+		layer, dialog or menu not shown yet) is only finalized and generated
+		with the group."""
+		return self.page is not None
+
 	def replace_children(self, children):
 		"""Replace all children by the new ones."""
-		self.remove_children()
+		self.remove_children(clear=not self.incremental)
 		self.children = children
+		self.invalidate()
 		self.remap_children()
 		for child in children:
 			child.parent = self
-			child.finalize(self.page)
-		if self.online():
-			if self.is_shown():
-				for child in children():
-					child.on_show()
-			self.clear_content()
-			self.set_content(children)
+		if self.is_prepared():
+			for child in children:
+				child.finalize(self.page)
+			if self.online():
+				if self.is_shown():
+					for child in children:
+						child.on_show()
+				self.set_content(children)
 
 	def insert(self, child, i = -1):
 		"""Add a child to the group."""
@@ -139,14 +150,16 @@ class Group(ParentComponent):
 			self.children.append(child)
 		else:
 			self.children.insert(i, child)
-		child.finalize(self.page)
-		if self.online():
-			if self.is_shown():
-				child.on_show()
-			if i < 0:
-				self.append_content(child)
-			else:
-				self.insert_content(child, i)
+		self.invalidate()
+		if self.is_prepared():
+			child.finalize(self.page)
+			if self.online():
+				if self.is_shown():
+					child.on_show()
+				if i < 0:
+					self.append_content(child)
+				else:
+					self.insert_content(child, i)
 		self.check_remap()
 
 	def remove(self, i):
@@ -156,8 +169,10 @@ class Group(ParentComponent):
 			i = self.children.index(child)
 		else:
 			child = self.children[i]
-		self.remove_content(i)
+		if self.is_prepared():
+			self.remove_content(i)
 		del self.children[i]
+		self.invalidate()
 		if self.online() and self.is_shown():
 			child.on_hide()
 		child.parent = None
@@ -166,6 +181,9 @@ class Group(ParentComponent):
 	def get_children(self):
 		return self.children
 
+	def is_cacheable(self):
+		return all(child.is_cacheable() for child in self.children)
+
 	def expands_horizontal(self):
 		return self.expandh
 
@@ -392,6 +410,9 @@ class Spring(Component):
 	def expands_vertical(self):
 		return self.vexpand
 
+	def is_cacheable(self):
+		return True
+
 	def gen(self, out):
 		out.write("<div")
 		self.gen_attrs(out)
@@ -432,17 +453,40 @@ LAYERED_PANE_MODEL = Model(
 )
 
 class LayeredPane(Group):
-	"""A group made of overlapping layer with only one visible at a time."""
+	"""A group made of overlapping layer with only one visible at a time.
+	The layers are finalized and generated only when they are shown the
+	first time."""
 
 	def __init__(self, comps, model = LAYERED_PANE_MODEL):
 		Group.__init__(self, model, comps)
 		self.add_class("layered-parent")
 		self.current = -1
+		self.lazy = set()
 		for child in self.get_children():
 			self.decorate_child(child)
 		if self.children != []:
 			self.set_layer(0)
 
+	def finalize(self, page):
+		Component.finalize(self, page)
+		for (i, child) in enumerate(self.children):
+			if i == self.current:
+				child.finalize(page)
+			else:
+				self.lazy.add(child)
+
+	def prepare_layer(self, num):
+		"""Finalize and generate the layer num if not already done."""
+		child = self.children[num]
+		if child in self.lazy:
+			self.lazy.remove(child)
+			child.finalize(self.page)
+			if self.online():
+				self.remove_content(num)
+				self.insert_content(child, num)
+			else:
+				self.invalidate()
+
 	def on_show(self):
 		if self.current >= 0:
 			self.get_children()[self.current].on_show()
@@ -461,6 +505,7 @@ class LayeredPane(Group):
 			self.children[self.current].on_hide()
 		self.current = num
 		if self.current >= 0:
+			self.prepare_layer(num)
 			self.children[self.current].remove_class("layered-inactive")
 			self.children[self.current].add_class("layered-active")
 			self.children[self.current].on_show()
@@ -487,16 +532,36 @@ class LayeredPane(Group):
 		self.decorate_child(child)
 
 	def remove(self, i):
+		if not isinstance(i, int):
+			i = self.children.index(i)
+		self.lazy.discard(self.children[i])
 		Group.remove(self, i)
 		if self.current >= i:
 			self.current = -1
 
+	def remove_children(self, clear=True):
+		self.lazy = set()
+		Group.remove_children(self, clear)
+
+	def find_next_focus(self, component=None):
+		if not self.enabled:
+			return None
+		elif component is not None:
+			return self.parent.find_next_focus(self)
+		elif self.current >= 0:
+			return self.children[self.current].find_next_focus()
+		else:
+			return None
+
 	def gen(self, out):
 		out.write('<div ')
 		self.gen_attrs(out)
 		out.write('>\n')
 		for c in self.children:
-			c.gen(out)
+			if c in self.lazy:
+				out.write(f'<div id="{c.get_id()}" class="layered-child layered-inactive"></div>\n')
+			else:
+				c.gen(out)
 		out.write('</div>\n')
 
 
@@ -243,11 +243,14 @@ class AssetImage(Image):
 		self.path = path
 		self.width = width
 		self.height = height
+		self.fragment = None
 
 	def gen(self, out):
-		out.write(f'<img src="{self.path}"')
-		if self.width is not None:
-			out.write(f' width="{self.width}"')
-		if self.height is not None:
-			out.write(f' width="{self.height}"')
-		out.write(">")
+		if self.fragment is None:
+			self.fragment = f'<img src="{self.path}"'
+			if self.width is not None:
+				self.fragment += f' width="{self.width}"'
+			if self.height is not None:
+				self.fragment += f' height="{self.height}"'
+			self.fragment += ">"
+		out.write(self.fragment)
@@ -0,0 +1,291 @@
+#
+#	This file is part of Orchid.
+#
+#    Orchid is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Lesser General Public License as
+#	published by the Free Software Foundation, either version 3 of the
+#	License, or (at your option) any later version.
+#
+#	Orchid is distributed in the hope that it will be useful, but
+#	WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#	GNU Lesser General Public License for more details.
+#
+#	You should have received a copy of the GNU Lesser General Public
+#	License along with Orchid. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Jobs running long operations in background for a page (see
+Page.run_background()) and event loop running the coroutine handlers."""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import importlib
+from inspect import iscoroutine
+import multiprocessing
+from queue import Empty
+import sys
+import threading
+import time
+
+PROGRESS_PERIOD = 0.1
+
+EXECUTORS = {}
+EXECUTORS_LOCK = threading.Lock()
+MANAGER = None
+CURRENT = threading.local()
+
+def get_current_page():
+	"""Get the page processing a request in the calling thread, if any."""
+	return getattr(CURRENT, "page", None)
+
+def get_executor(name):
+	"""Get the executor shared by the jobs for the given name, "thread"
+	or "process". The executors are created at first use."""
+	with EXECUTORS_LOCK:
+		try:
+			return EXECUTORS[name]
+		except KeyError:
+			if name == "thread":
+				executor = ThreadPoolExecutor(thread_name_prefix="orchid-job")
+			elif name == "process":
+				executor = ProcessPoolExecutor()
+			else:
+				raise ValueError(f"unknown executor: {name}")
+			EXECUTORS[name] = executor
+			return executor
+
+def get_manager():
+	"""Get the multiprocessing manager used to communicate with jobs
+	running in another process."""
+	global MANAGER
+	with EXECUTORS_LOCK:
+		if MANAGER is None:
+			MANAGER = multiprocessing.Manager()
+		return MANAGER
+
+
+class Progress:
+	"""Object passed to the function of a job to report its progress and
+	to test if it has been cancelled."""
+
+	def set_progress(self, percent):
+		"""Report the progress of the job, percent is a number between 0
+		and 1. The reports are rate-limited: a report following the
+		previous one by less than the period of the job is ignored."""
+		pass
+
+	def is_cancelled(self):
+		"""Test if the job has been cancelled. The function of the job
+		is expected to test it regularly and to stop if it is True."""
+		return False
+
+
+class ProcessProgress(Progress):
+	"""Progress of a job running in another process: the progress is sent
+	through a queue and cancellation is received by an event, both
+	provided by the multiprocessing manager."""
+
+	def __init__(self, queue, cancelled, period):
+		self.queue = queue
+		self.cancelled = cancelled
+		self.period = period
+		self.last = 0
+
+	def set_progress(self, percent):
+		now = time.monotonic()
+		if now - self.last >= self.period:
+			self.last = now
+			self.queue.put(percent)
+
+	def is_cancelled(self):
+		return self.cancelled.is_set()
+
+
+class Job(Progress):
+	"""Handle of a function running in background for a page. The function
+	is called with a Progress object and the given arguments. Its progress
+	is displayed by the interface (functions start_process(), set_process()
+	and complete_process()) and, at its end, the result is passed to
+	on_done or the raised exception to on_error (default displays the error
+	with the interface). These calls are posted to the page, that is,
+	performed by the thread serving the page."""
+
+	def __init__(self, page, fun, args, executor="thread", interface=None,
+	message="", on_done=None, on_error=None, period=PROGRESS_PERIOD):
+		self.page = page
+		self.interface = page.get_interface() if interface is None else interface
+		self.on_done = on_done
+		self.on_error = on_error
+		self.period = period
+		self.cancelled = threading.Event()
+		self.last = 0
+		self.result = None
+		self.error = None
+		self.interface.start_process(message)
+		page.start_polling()
+		if executor == "process":
+			manager = get_manager()
+			progress = ProcessProgress(manager.Queue(), manager.Event(), period)
+			self.link = progress
+		else:
+			progress = self
+			self.link = None
+		self.future = get_executor(executor).submit(fun, progress, *args)
+		if self.link is not None:
+			threading.Thread(target=self.monitor, daemon=True).start()
+		self.future.add_done_callback(
+			lambda future: page.post(self.complete))
+
+	def set_progress(self, percent):
+		now = time.monotonic()
+		if now - self.last >= self.period:
+			self.last = now
+			self.page.post(self.interface.set_process, percent)
+
+	def monitor(self):
+		"""Transfer the progress from a job running in another process."""
+		while not self.future.done():
+			try:
+				self.set_progress(self.link.queue.get(timeout=self.period))
+			except Empty:
+				pass
+
+	def is_cancelled(self):
+		return self.cancelled.is_set()
+
+	def cancel(self):
+		"""Cancel the job: it is removed if not started yet, else the
+		function is informed by its Progress object."""
+		self.cancelled.set()
+		if self.link is not None:
+			self.link.cancelled.set()
+		self.future.cancel()
+
+	def is_done(self):
+		"""Test if the job is ended (completed, failed or cancelled)."""
+		return self.future.done()
+
+	def complete(self):
+		"""Called in the thread of the page when the function is ended."""
+		self.page.stop_polling()
+		self.interface.complete_process()
+		if self.future.cancelled() or self.cancelled.is_set():
+			return
+		self.error = self.future.exception()
+		if self.error is not None:
+			if self.on_error is not None:
+				self.on_error(self.error)
+			else:
+				self.interface.show_error(str(self.error))
+		else:
+			self.result = self.future.result()
+			if self.on_done is not None:
+				self.on_done(self.result)
+
+
+class EventLoop(asyncio.SelectorEventLoop):
+	"""Event loop running the coroutine handlers in its own thread. Each step
+	of a coroutine is performed with the given lock held (the lock of the
+	server manager), so the coroutines can change the components and the
+	variables like the other handlers. The resulting messages are sent in
+	the answer of the next request of the page: the page starting a
+	coroutine polls the server until its end."""
+
+	def __init__(self, lock):
+		asyncio.SelectorEventLoop.__init__(self)
+		self.lock = lock
+		self.thread = threading.Thread(target=self.run_forever, daemon=True,
+			name="orchid-loop")
+		self.thread.start()
+
+	def call_soon(self, callback, *args, context=None):
+		return asyncio.SelectorEventLoop.call_soon(self,
+			self.call_locked, callback, *args, context=context)
+
+	def call_locked(self, callback, *args):
+		"""Call the callback with the lock held."""
+		with self.lock:
+			callback(*args)
+
+	def start(self, coro):
+		"""Schedule the coroutine and return its concurrent future. An
+		exception raised by the coroutine is displayed on the standard
+		error."""
+		page = get_current_page()
+		future = asyncio.run_coroutine_threadsafe(coro, self)
+		future.add_done_callback(report_error)
+		if page is not None:
+			page.start_polling()
+			future.add_done_callback(lambda _: page.post(page.stop_polling))
+		return future
+
+def report_error(future):
+	"""Display on the standard error the exception raised by the coroutine
+	of the future, if any."""
+	if not future.cancelled():
+		exn = future.exception()
+		if exn is not None:
+			sys.stderr.write(f"ERROR: {exn!r}\n")
+
+LOOP = None
+
+def get_loop():
+	"""Get the event loop running the coroutine handlers. It is usually
+	installed by the server (see set_loop()) else it is created at first
+	use with its own lock."""
+	global LOOP
+	with EXECUTORS_LOCK:
+		if LOOP is None:
+			LOOP = EventLoop(threading.RLock())
+		return LOOP
+
+def set_loop(loop):
+	"""Install the event loop running the coroutine handlers."""
+	global LOOP
+	LOOP = loop
+
+def call(fun, *args):
+	"""Call the handler fun with the given arguments. If fun is a coroutine
+	function, the coroutine is scheduled on the event loop and its future
+	is returned. Else the result of fun is returned."""
+	res = fun(*args)
+	if iscoroutine(res):
+		return get_loop().start(res)
+	else:
+		return res
+
+
+def resolve(module, qualname):
+	"""Get the object of the module designated by the qualified name or
+	None if there is no such object."""
+	obj = sys.modules.get(module)
+	for name in qualname.split("."):
+		obj = getattr(obj, name, None)
+	return obj
+
+def call_pure(fun, *args):
+	"""Called in a worker process to perform the computation fun. fun may
+	also be a pair (module, qualified name) designating a function
+	decorated by orchid.mind.offload() (or the original function)."""
+	if isinstance(fun, tuple):
+		importlib.import_module(fun[0])
+		fun = resolve(*fun)
+	return getattr(fun, "offloaded", fun)(*args)
+
+async def offload(fun, args, on_done=None, on_error=None):
+	"""Coroutine performing fun(*args) in the process pool and then passing
+	the result to on_done or the raised exception to on_error (default
+	displays it on the standard error). fun and args must be picklable."""
+	loop = asyncio.get_running_loop()
+	try:
+		res = await loop.run_in_executor(get_executor("process"),
+			call_pure, fun, *args)
+	except Exception as exn:
+		if on_error is None:
+			sys.stderr.write(f"ERROR: {exn}\n")
+		else:
+			on_error(exn)
+	else:
+		if on_done is not None:
+			on_done(res)
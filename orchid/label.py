@@ -1,25 +1,62 @@
 """Label component."""
 
-from orchid.base import Component, Model, Displayable
+from orchid.base import Component, Model, Displayable, cached
 from orchid.displayable import Text
+from orchid.mind import Var
 from orchid.util import ProxyInterface, STANDARD_INTERFACE, Buffer
 
 LABEL_MODEL = Model()
 
 
 class Label(Component):
-	"""Component displaying the given content that may be plain or an instance of Displayable."""
+	"""Component displaying the given content that may be plain, an instance
+	of Displayable or a variable (whose value is displayed as plain text)."""
 
 	def __init__(self, text):
 		Component.__init__(self, LABEL_MODEL)
 		self.text = None
+		self.var = None
+		self.var_text = None
+		if isinstance(text, Var):
+			self.var = text
+			self.var_text = self.get_var_text()
+			text = self.var_text
 		self.set_text(text)
 		self.add_class("label")
 
+	def get_var_text(self):
+		"""Get the text displaying the variable."""
+		value = ~self.var
+		if value is None:
+			return ""
+		else:
+			return self.var.get_type().as_text(value)
+
+	def on_show(self):
+		Component.on_show(self)
+		if self.var is not None:
+			self.var.add_observer(self)
+			self.update(self.var)
+
+	def on_hide(self):
+		Component.on_hide(self)
+		if self.var is not None:
+			self.var.remove_observer(self)
+
+	def update(self, subject):
+		text = self.get_var_text()
+		if text != self.var_text:
+			self.var_text = text
+			self.set_text(text)
+
 	def finalize(self, page):
 		Component.finalize(self, page)
 		self.text.finalize(page)
 
+	def is_cacheable(self):
+		return isinstance(self.text, Text)
+
+	@cached
 	def gen(self, out):
 		out.write('<div')
 		self.gen_attrs(out)
@@ -35,6 +72,7 @@ class Label(Component):
 			self.text = text
 		else:
 			self.text = Text.make(text)
+		self.invalidate()
 		if self.online():
 			self.text.finalize(self.get_page())
 			buf = Buffer()
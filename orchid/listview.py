@@ -47,6 +47,9 @@ class ListView(Component, ListObserver):
 			self.list = list
 			self.enabled = True
 
+		def get_owners(self):
+			return [self, self.list]
+
 		def on_append(self, x):
 			if self.enabled:
 				self.list.mark_select(x)
@@ -89,6 +92,7 @@ class ListView(Component, ListObserver):
 		else:
 			self.items = items
 		self.children = None
+		self.fragments = None
 		self.select_mode = select_mode
 		if isinstance(selection, ListVar):
 			self.selection = selection
@@ -96,11 +100,9 @@ class ListView(Component, ListObserver):
 			self.selection = ListVar(selection)
 		self.context_menu = context_menu
 		if select_mode != SELECT_NONE:
-			self.set_attr('onclick',
-				 f"list_on_click('{self.get_id()}', event);")
+			self.set_event("click", "list_on_click")
 		if context_menu is not None:
-			self.set_attr("oncontextmenu",
-				f"list_on_context_menu('{self.get_id()}', event);")
+			self.set_event("contextmenu", "list_on_context_menu")
 		self.displayer = displayer
 		self.select_observer = ListView.SelectObserver(self)
 
@@ -173,22 +175,42 @@ class ListView(Component, ListObserver):
 		self.items.add_observer(self)
 		self.selection.clear()
 		self.children = None
+		self.fragments = None
 		if self.online():
 			self.regen()
 
+	def get_fragment(self, i):
+		"""Get the HTML of the item at index i. The generated HTML of
+		cacheable items is kept until the item is replaced or changes (see
+		AbstractComponent.invalidate())."""
+		children = self.get_children()
+		if self.fragments is None:
+			self.fragments = [None] * len(children)
+		child = children[i]
+		fragment = self.fragments[i]
+		if fragment is None or fragment[0] != child.version \
+		or not child.is_cacheable():
+			fragment = (child.version, f"<div>{buffer(child.gen)}</div>")
+			self.fragments[i] = fragment
+		return fragment[1]
+
 	def on_append(self, x):
 		item = self.make(self.items.size(), x)
 		self.get_children().append(item)
+		if self.fragments is not None:
+			self.fragments.append(None)
 		if self.online():
-			self.append_content(f"<div>{buffer(item.gen)}</div>")
+			self.append_content(self.get_fragment(len(self.children) - 1))
 
 	def on_insert(self, i, x):
 		selection = [j+1 if j >= i else j for j in ~self.selection]
 		self.deselect_all()
 		item = self.make(i, x)
 		self.get_children().insert(i, item)
+		if self.fragments is not None:
+			self.fragments.insert(i, None)
 		if self.online():
-			self.insert_content(f"<div>{buffer(item.gen)}</div>", i)
+			self.insert_content(self.get_fragment(i), i)
 		for j in selection:
 			self.selection.append(j)
 
@@ -196,6 +218,8 @@ class ListView(Component, ListObserver):
 		selection = [j-1 if j >= i else j for j in ~self.selection if j != i]
 		self.deselect_all()
 		del self.children[i]
+		if self.fragments is not None:
+			del self.fragments[i]
 		if self.online():
 			self.remove_content(i)
 		for j in selection:
@@ -205,8 +229,11 @@ class ListView(Component, ListObserver):
 		children = self.get_children()
 		item = self.make(i, x)
 		children[i] = item
+		if self.fragments is not None:
+			self.fragments[i] = None
 		item.finalize(self.page)
 		if self.online():
+			self.structure_changed()
 			self.call("list_set", {
 				"id": self.get_id(),
 				"index": i,
@@ -214,7 +241,10 @@ class ListView(Component, ListObserver):
 			})
 
 	def on_clear(self):
+		self.children = None
+		self.fragments = None
 		if self.online():
+			self.structure_changed()
 			self.call("list_clear", {"id": self.get_id()})
 
 	def get_children(self):
@@ -264,8 +294,6 @@ class ListView(Component, ListObserver):
 
 	def gen_content(self, out):
 		"""Generate the content of the view."""
-		for item in self.get_children():
-			out.write("<div>")
-			item.gen(out)
-			out.write("</div>")
+		for i in range(len(self.get_children())):
+			out.write(self.get_fragment(i))
 
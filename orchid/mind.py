@@ -23,9 +23,15 @@ An application, and its different views, can be seen as a set of data on which
 actions applies. This structure may also be used to provide external interface
 to the application."""
 
+from functools import wraps
+import json
+import operator
 import re
+import threading
+from weakref import WeakValueDictionary
 
-from orchid.util import Subject, Observer
+from orchid import job
+from orchid.util import Subject, Observer, FunctionObserver
 
 def is_python_type(t):
 	return isinstance(t, type)
@@ -74,7 +80,10 @@ class BaseType(Type):
 		self.record(type, self)
 
 	def parse(self, text):
-		return self.parser(text)
+		try:
+			return self.parser(text)
+		except ValueError:
+			return None
 
 	def __str__(self):
 		return str(self.type)
@@ -155,6 +164,16 @@ class RangeType(Type):
 			null = min
 		self.null = null
 
+	def parse(self, text):
+		try:
+			value = int(text)
+		except ValueError:
+			return None
+		if self.min <= value <= self.max:
+			return value
+		else:
+			return None
+
 class Types:
 	"""Record all existing types."""
 
@@ -292,16 +311,104 @@ class Entity(Subject):
 			observer.on_icon_change(icon)
 
 
+class BatchState(threading.local):
+	"""State of the batches of a thread: depth of nested batches and
+	changed variables."""
+
+	def __init__(self):
+		self.depth = 0
+		self.pending = {}
+
+
+class Batch:
+	"""Batch of variable updates used as a context manager or as a
+	decorator: the observers of the changed variables are notified only
+	when the outermost batch exits and each observer is notified once per
+	changed variable, with the final state of the variables. The batches
+	are local to the running thread."""
+
+	STATE = BatchState()
+
+	def __enter__(self):
+		Batch.STATE.depth += 1
+		return self
+
+	def __exit__(self, *args):
+		Batch.STATE.depth -= 1
+		if Batch.STATE.depth == 0:
+			Batch.flush()
+		return False
+
+	def __call__(self, fun):
+		@wraps(fun)
+		def call(*args, **kwargs):
+			with self:
+				return fun(*args, **kwargs)
+		return call
+
+	@staticmethod
+	def record(var):
+		"""Record a changed variable. Return False if there is no current
+		batch (and the observers have to be notified immediately)."""
+		if Batch.STATE.depth == 0:
+			return False
+		Batch.STATE.pending[id(var)] = var
+		return True
+
+	@staticmethod
+	def flush():
+		"""Notify the observers of the changed variables. The changes
+		performed by the observers are batched in turn."""
+		while Batch.STATE.pending:
+			vars = list(Batch.STATE.pending.values())
+			Batch.STATE.pending.clear()
+			Batch.STATE.depth += 1
+			try:
+				for var in vars:
+					done = set()
+					for observer in list(var.get_observers()):
+						if isinstance(observer, FunctionObserver):
+							key = id(observer.fun)
+						else:
+							key = id(observer)
+						if key not in done:
+							done.add(key)
+							observer.update(var)
+			finally:
+				Batch.STATE.depth -= 1
+
+def batch(fun=None):
+	"""Build a batch of variable updates (see Batch). If fun is given,
+	return fun decorated to run in a batch."""
+	if fun is None:
+		return Batch()
+	else:
+		return Batch()(fun)
+
+IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes)
+
+def same_value(x, y):
+	"""Test if x and y are the same immutable value."""
+	return type(x) is type(y) and isinstance(x, IMMUTABLE_TYPES) and x == y
+
+
 class Var(Entity):
 	"""A variable that contains a vlue that can be observed.
 	As Python is not strict about types, a type ma also be given.
 	This includes basic types of Python like bool, int, float, str
 	but more types derived from Type can be given. This type may be used
-	to derive automatically consistent UI."""
+	to derive automatically consistent UI.
+
+	Each change of a variable is stamped with the value of a global clock
+	used by predicates to detect that the variable changed since their
+	last evaluation."""
+
+	CLOCK = 0
 
 	def __init__(self, value, type = None, **args):
 		Entity.__init__(self, **args)
 		self.value = value
+		self.stamp = 0
 		if type is None:
 			self.type = Types.of(value)
 		else:
@@ -317,10 +424,24 @@ class Var(Entity):
 		return self.value
 
 	def set(self, value):
-		"""Change the value in the variable."""
+		"""Change the value in the variable. The observers are not notified
+		if the value is an unchanged immutable value."""
+		if same_value(value, self.value):
+			return
 		self.value = value
 		self.update_observers()
 
+	def touch(self):
+		"""Record that the value of the variable changed (to be called when
+		the value is modified in place)."""
+		Var.CLOCK += 1
+		self.stamp = Var.CLOCK
+
+	def update_observers(self):
+		self.touch()
+		if not Batch.record(self):
+			Entity.update_observers(self)
+
 	def __repr__(self):
 		return f"var({self.value}: {self.type})"
 
@@ -356,6 +477,67 @@ class Var(Entity):
 		return ge(self, x)
 
 
+class Computed(Var, Observer):
+	"""Variable whose value is computed by the function fun from the values
+	of the variables deps. The value is cached and lazily recomputed when
+	it is read after a change of the dependencies. The observers of the
+	variable are only notified when the computed value changes."""
+
+	def __init__(self, fun, deps, type=None, **args):
+		Observer.__init__(self)
+		self.fun = fun
+		self.deps = list(deps)
+		self.computed = Var.CLOCK
+		Var.__init__(self, fun(), type, **args)
+		for dep in self.deps:
+			dep.add_observer(self)
+
+	@property
+	def stamp(self):
+		self.refresh()
+		return self.changed
+
+	@stamp.setter
+	def stamp(self, stamp):
+		self.changed = stamp
+
+	def refresh(self):
+		"""Recompute the value if a dependency changed. Return True if the
+		value changed."""
+		if any(dep.stamp > self.computed for dep in self.deps):
+			self.computed = Var.CLOCK
+			value = self.fun()
+			if not same_value(value, self.value):
+				self.value = value
+				self.touch()
+				return True
+		return False
+
+	def get(self):
+		self.refresh()
+		return self.value
+
+	def __invert__(self):
+		return self.get()
+
+	def update(self, subject):
+		if self.get_observers() and self.refresh():
+			if not Batch.record(self):
+				Entity.update_observers(self)
+
+	def __repr__(self):
+		return f"computed({self.value}: {self.type})"
+
+	def __str__(self):
+		return f"computed({self.value}: {self.type})"
+
+
+def computed(fun, deps, type=None, **args):
+	"""Build a variable which value is computed by fun (without parameter)
+	from the variables in deps (see Computed)."""
+	return Computed(fun, deps, type, **args)
+
+
 class PredicateError(Exception):
 	"""Raised as soon as there is a predicate error."""
 
@@ -383,33 +565,38 @@ class EnableObserver(Observer):
 
 
 class VarSet:
-	"""Set of variable using only "is" to test ownership."""
+	"""Set of variable using only "is" to test ownership (variables are
+	recorded by identifier, in insertion order)."""
 
 	def __init__(self, vars = None):
-		if vars is None:
-			self.vars = []
-		else:
-			self.vars = list(vars)
+		self.vars = {}
+		if vars is not None:
+			self |= vars
 
 	def __iter__(self):
-		return iter(self.vars)
+		return iter(self.vars.values())
+
+	def __len__(self):
+		return len(self.vars)
 
 	def __contains__(self, x):
-		return any(x is y for y in self.vars)
+		return id(x) in self.vars
 
 	def __or__(self, added):
 		for x in added:
-			if x not in self:
-				self.vars.append(x)
+			self.vars.setdefault(id(x), x)
 		return self
 
 	def __str__(self):
-		return f"{', '.join(str(x) for x in self.vars)}"
+		return f"{', '.join(str(x) for x in self)}"
 
 
 class PredicateHandler(Subject, Observer):
 	"""Manage the predicate by observing the used variables. If a variable is
-	changed and the predicate value is changed, update its observers."""
+	changed and the predicate value is changed, update its observers.
+	As the evaluation of predicates is memoized (see
+	AbstractPredicate.evaluate()), the handlers of predicates sharing
+	sub-predicates only recompute them once per change."""
 
 	def __init__(self, pred):
 		Subject.__init__(self)
@@ -423,6 +610,7 @@ class PredicateHandler(Subject, Observer):
 		if not self.get_observers():
 			for var in self.vars:
 				var.add_observer(self)
+			self.check()
 		Subject.add_observer(self, observer)
 
 	def remove_observer(self, observer):
@@ -434,7 +622,7 @@ class PredicateHandler(Subject, Observer):
 
 	def check(self):
 		"""Check and return the value of the pedicate."""
-		self.value = self.pred.check()
+		self.value = self.pred.evaluate()
 		return self.value
 
 	def update(self, subject):
@@ -446,17 +634,20 @@ class PredicateHandler(Subject, Observer):
 
 	def get_value(self):
 		"""Get the value of the pedicate."""
-		if self.value is None:
-			self.check()
-		return self.value
+		return self.pred.evaluate()
 
 
 class AbstractPredicate:
 	"""A formula that depends on variables and that may be True or
 	False. In turn, a predicate may be observed for changes."""
+	__slots__ = ("handler", "volatile", "deps", "stamp", "cache", "__weakref__")
 
 	def __init__(self):
 		self.handler = None
+		self.volatile = None
+		self.deps = None
+		self.stamp = -1
+		self.cache = None
 
 	def collect_vars(self, vars):
 		"""Called to collect variables used in the predicate that has to be
@@ -468,6 +659,39 @@ class AbstractPredicate:
 		Default implementation returns True."""
 		return True
 
+	def is_volatile(self):
+		"""Test if the predicate depends on other state than its variables
+		(and must be recomputed at each evaluation). Default implementation
+		returns True."""
+		return True
+
+	def evaluate(self):
+		"""Get the value of the predicate. The value is memoized until one of
+		the variables the predicate depends on changes: only the predicates
+		whose variables changed are recomputed and the predicates shared by
+		several others are computed once per change."""
+		if self.volatile is None:
+			self.volatile = self.is_volatile()
+			if not self.volatile:
+				vars = VarSet()
+				self.collect_vars(vars)
+				self.deps = list(vars)
+		if self.volatile:
+			return self.check()
+		clock = Var.CLOCK
+		if self.stamp != clock:
+			if self.stamp < 0 or any(var.stamp > self.stamp for var in self.deps):
+				self.cache = self.check()
+			self.stamp = clock
+		return self.cache
+
+	def to_js(self, env):
+		"""Compile the predicate as a Javascript expression. env is a function
+		taking a variable and returning the Javascript expression of its value
+		in the client or None. Return None if the predicate cannot be compiled.
+		Default implementation returns None."""
+		return None
+
 	def get_handler(self):
 		"""Get the handler for the predicate."""
 		if self.handler is None:
@@ -509,15 +733,21 @@ class AbstractPredicate:
 
 
 class Predicate(AbstractPredicate):
-	"""A predicate that listen to a set of variables and check with a function."""
+	"""A predicate that listen to a set of variables and check with a function.
+	The function is called at each evaluation unless pure is True: it is
+	then expected to only depend on the variables and its value is memoized
+	until one of them changes."""
+	__slots__ = ("vars", "fun", "js", "pure")
 
-	def __init__(self, vars = None, fun = lambda: True ):
+	def __init__(self, vars = None, fun = lambda: True, js = None, pure = False):
 		AbstractPredicate.__init__(self)
 		if vars is None:
 			self.vars = []
 		else:
 			self.vars = vars
 		self.fun = fun
+		self.js = js
+		self.pure = pure
 
 	def collect_vars(self, vars):
 		vars |= self.vars
@@ -525,12 +755,32 @@ class Predicate(AbstractPredicate):
 	def check(self):
 		return self.fun()
 
+	def is_volatile(self):
+		return not self.pure or not self.vars
+
+	def to_js(self, env):
+		if self.js is None:
+			return None
+		else:
+			return self.js(env)
+
 
-TRUE = AbstractPredicate()
+class TruePredicate(AbstractPredicate):
+	"""Predicate always true."""
+	__slots__ = ()
+
+	def is_volatile(self):
+		return False
+
+	def to_js(self, env):
+		return "true"
+
+TRUE = TruePredicate()
 
 
 class MultiPredicate(AbstractPredicate):
 	"""Base class of composed predicates."""
+	__slots__ = ("preds",)
 
 	def __init__(self, preds):
 		AbstractPredicate.__init__(self)
@@ -542,6 +792,9 @@ class MultiPredicate(AbstractPredicate):
 		for pred in self.preds:
 			pred.collect_vars(vars)
 
+	def is_volatile(self):
+		return any(pred.is_volatile() for pred in self.preds)
+
 	def add_error_observer(self, observer):
 		for pred in self.preds:
 			pred.add_error_observer(observer)
@@ -582,6 +835,12 @@ class AbstractAction(Entity):
 		Default implementation does nothing."""
 		pass
 
+	def get_enable_js(self, env):
+		"""Get the enabling condition of the action compiled as a Javascript
+		expression (see AbstractPredicate.to_js()). Return None if the
+		enabling cannot be evaluated by the client (default implementation)."""
+		return None
+
 	def __str__(self):
 		return f"<action {self.label}>"
 
@@ -603,14 +862,22 @@ class Action(AbstractAction):
 	perform an action (method action()) when it is invoked.
 	In addition, an action may ne enabled or not depending on
 	an enable predication (default to TRUE - the predicate).
-	The observer must implement EnableObserver."""
+	The observer must implement EnableObserver.
 
-	def __init__(self, fun, enable=TRUE, **args):
+	fun is called with the interface of the activator. However, if offload
+	is True, fun is a CPU-bound computation called WITHOUT ARGUMENT (the
+	interface cannot be passed to another process) in a process of the
+	pool (fun must be picklable) and its result is passed to on_done in
+	the context of the page (see offload())."""
+
+	def __init__(self, fun, enable=TRUE, offload=False, on_done=None, **args):
 		AbstractAction.__init__(self, **args)
 		self.enable_pred = to_predicate(enable)
 		assert(isinstance(self.enable_pred, AbstractPredicate))
 		self.enable_count = 0
 		self.fun = fun
+		self.offload = offload
+		self.on_done = on_done
 
 	def add_enable_observer(self, observer):
 		if self.enable_count == 0:
@@ -627,8 +894,18 @@ class Action(AbstractAction):
 	def is_enabled(self):
 		return self.enable_pred.get_value()
 
+	def get_enable_js(self, env):
+		return self.enable_pred.to_js(env)
+
 	def perform(self, interface):
-		self.fun(interface)
+		"""Call fun with the interface or, if offloaded, without argument."""
+		if not self.offload:
+			job.call(self.fun, interface)
+		elif interface is None:
+			job.get_loop().start(job.offload(self.fun, (), self.on_done))
+		else:
+			job.get_loop().start(job.offload(self.fun, (), self.on_done,
+				lambda exn: interface.show_error(str(exn))))
 
 	def update(self, subject):
 		if self.enable_pred.get_value():
@@ -646,114 +923,306 @@ def get_value(x):
 	else:
 		return x
 
+def offload(fun=None, on_done=None, on_error=None):
+	"""Decorator marking the function fun as a CPU-bound computation. When
+	the decorated function is called, fun is performed with the values of
+	the arguments (variables are replaced by their values) in a process of
+	the pool, without blocking the server. Its result is then passed to
+	on_done, or the raised exception to on_error, in the context of the
+	page (see orchid.job.EventLoop). The call returns a concurrent future.
+	The worker process finds fun by its module and its qualified name
+	(TypeError is raised else, for example for a nested function) and the
+	arguments must be picklable. For example:
+	```
+	@offload(on_done=chart.set)
+	def compute_chart(data):
+		...
+
+	data.add_observer(compute_chart)
+	```"""
+	def make(fun):
+		@wraps(fun)
+		def handler(*args):
+			ref = (fun.__module__, fun.__qualname__)
+			if job.resolve(*ref) not in (handler, fun):
+				raise TypeError(f"cannot offload {fun.__qualname__}: it must be "
+					f"found by its qualified name in module {fun.__module__}")
+			args = tuple(get_value(arg) for arg in args)
+			return job.get_loop().start(job.offload(ref, args, on_done, on_error))
+		handler.offloaded = fun
+		return handler
+	if fun is None:
+		return make
+	else:
+		return make(fun)
+
+
+JS_CONSTANT_TYPES = (type(None), bool, int, float, str)
+
+def value_to_js(x, env):
+	"""Get the Javascript expression for a constant or a variable.
+	Return None if it cannot be expressed in Javascript."""
+	if isinstance(x, Var):
+		return env(x)
+	elif isinstance(x, JS_CONSTANT_TYPES):
+		return json.dumps(x)
+	else:
+		return None
+
+def values_to_js(fun, *args):
+	"""Build a function compiling to Javascript the predicate made of the
+	values args. fun takes as parameter the Javascript expressions of the
+	values. Return None if one value cannot be compiled."""
+	def js(env):
+		exprs = [value_to_js(x, env) for x in args]
+		if None in exprs:
+			return None
+		else:
+			return fun(*exprs)
+	return js
+
+INTERNED = WeakValueDictionary()
+
+def value_key(x):
+	"""Get the key identifying a value (constant, variable or predicate) in
+	the key of an interned predicate. Return None if x cannot be part of
+	a key."""
+	if isinstance(x, (Var, AbstractPredicate)):
+		return id(x)
+	elif isinstance(x, JS_CONSTANT_TYPES):
+		return (type(x), x)
+	else:
+		return None
+
+def intern(make, *key):
+	"""Get the predicate identified by key (made of a kind and values)
+	building it with make() if it does not exist. Structurally identical
+	predicates over the same variables are so shared (and evaluated once).
+	If a value of the key cannot be identified, the predicate is not
+	interned."""
+	key = (key[0],) + tuple(value_key(x) for x in key[1:])
+	if None in key:
+		return make()
+	try:
+		return INTERNED[key]
+	except KeyError:
+		pred = make()
+		INTERNED[key] = pred
+		return pred
+
+
+class ValuePredicate(Predicate):
+	"""Predicate applying the function op to values that may be constants
+	or variables. js_op, if given, builds the Javascript expression from
+	the Javascript expressions of the values."""
+	__slots__ = ("values", "op", "js_op")
+
+	def __init__(self, values, op, js_op=None):
+		Predicate.__init__(self, [v for v in values if isinstance(v, Var)],
+			pure=True)
+		self.values = values
+		self.op = op
+		self.js_op = js_op
+
+	def check(self):
+		return self.op(*[get_value(x) for x in self.values])
+
+	def to_js(self, env):
+		if self.js_op is None:
+			return None
+		exprs = [value_to_js(x, env) for x in self.values]
+		if None in exprs:
+			return None
+		else:
+			return self.js_op(*exprs)
+
+
 def not_null(var):
 	"""Generate a predicate that test if the variable is not None, 0,
 	empty text, empty list, etc."""
-	return Predicate(vars=[var], fun=lambda: bool(~var))
+	return intern(lambda: ValuePredicate([var], operator.truth,
+		lambda x: f"!!({x})"), "not_null", var)
 
 def is_null(var):
 	"""Generate a predicate that test if the variable is one of None, 0,
 	empty text, empty list, etc."""
-	return Predicate(vars=[var], fun=lambda: not bool(~var))
+	return intern(lambda: ValuePredicate([var], operator.not_,
+		lambda x: f"!({x})"), "is_null", var)
 
 def equals(x, y):
 	"""Predicate testing if x = y. x and y may be any value and specially
 	variables that will be observed."""
-	return Predicate(
-		[v for v in [x, y] if isinstance(v, Var)],
-		fun=lambda: get_value(x) == get_value(y)
-	)
+	return intern(lambda: ValuePredicate([x, y], operator.eq,
+		lambda x, y: f"(({x}) === ({y}))"), "equals", x, y)
+
+
+class NotPredicate(MultiPredicate):
+	"""Predicate inverting the result of another predicate."""
+	__slots__ = ()
+
+	def check(self):
+		return not self.preds[0].evaluate()
+
+	def to_js(self, env):
+		js = self.preds[0].to_js(env)
+		return None if js is None else f"!({js})"
 
 def not_(pred):
 	"""Predicate inverting the result of another predicate."""
-	class NotPredicate(MultiPredicate):
-		def __init__(self):
-			MultiPredicate.__init__(self, [pred])
-		def check(self):
-			return not self.preds[0].check()
-	return NotPredicate()
+	pred = to_predicate(pred)
+	return intern(lambda: NotPredicate([pred]), "not", pred)
+
+def preds_to_js(preds, op, env):
+	"""Compile to Javascript the list of predicates combined with the
+	Javascript operator op. Return None if a predicate cannot be compiled."""
+	exprs = [pred.to_js(env) for pred in preds]
+	if None in exprs:
+		return None
+	else:
+		return f"({f' {op} '.join(exprs)})"
+
+
+class AndPredicate(MultiPredicate):
+	"""Predicate performing an AND with the sub-predicates."""
+	__slots__ = ()
+
+	def check(self):
+		for pred in self.preds:
+			if not pred.evaluate():
+				return False
+		return True
+
+	def to_js(self, env):
+		return preds_to_js(self.preds, "&&", env)
 
 def and_(*preds):
 	"""Predicate performing an AND with the given predicates."""
-	class AndPredicate(MultiPredicate):
-		def __init__(self):
-			MultiPredicate.__init__(self, preds)
-		def check(self):
-			for pred in self.preds:
-				if not pred.check():
-					return False
-			return True
-	return AndPredicate()
+	preds = [to_predicate(pred) for pred in preds]
+	return intern(lambda: AndPredicate(preds), "and", *preds)
+
+
+class OrPredicate(MultiPredicate):
+	"""Predicate performing an OR with the sub-predicates."""
+	__slots__ = ()
+
+	def check(self):
+		return any(pred.evaluate() for pred in self.preds)
+
+	def to_js(self, env):
+		return preds_to_js(self.preds, "||", env)
 
 def or_(*preds):
 	"""Predicate performing an OR with the given predicates."""
-	class OrPredicate(MultiPredicate):
-		def __init__(self):
-			MultiPredicate.__init__(self, preds)
-		def check(self):
-			return any(pred.check() for pred in self.preds)
-	return OrPredicate()
+	preds = [to_predicate(pred) for pred in preds]
+	return intern(lambda: OrPredicate(preds), "or", *preds)
+
+PASSWORD_JS = """((v) => {
+	if(v == null)
+		return false;
+	const n = (r) => (v.match(r) || []).length;
+	const s = [...v].length, l = n(/\\p{Ll}/gu), u = n(/\\p{Lu}/gu), d = n(/\\p{Nd}/gu);
+	return s >= %d && l >= %d && u >= %d && d >= %d && s - l - u - d >= %d;
+})(%s)"""
+
+def is_other(c):
+	"""Test if c is not a lowercase letter, an uppercase letter or a
+	digit."""
+	return not (c.islower() or c.isupper() or c.isdigit())
+
+def count(i):
+	"""Count the items of the iterable i."""
+	c = 0
+	for _ in i:
+		c += 1
+	return c
 
 def is_password(var, size=8, lower=1, upper=1, digit=1, other=1):
 	"""Test if the variable contains at least size characters with lower
 	lowercase letter, upper uppercase letters, digit characters and other
 	characters."""
-	def is_other(c):
-		return not (c.islower() or c.isupper() or c.isdigit())
-	def count(i):
-		c = 0
-		for _ in i:
-			c += 1
-		return c
-	return Predicate([var], fun=lambda:
-		~var is not None and \
-		len(~var) >= size and \
-		count(filter(str.islower, ~var)) >= lower and \
-		count(filter(str.isupper, ~var)) >= upper and \
-		count(filter(str.isdigit, ~var)) >= digit and \
-		count(filter(is_other, ~var)) >= other
-	)
+	def check(x):
+		return x is not None and \
+			len(x) >= size and \
+			count(filter(str.islower, x)) >= lower and \
+			count(filter(str.isupper, x)) >= upper and \
+			count(filter(str.isdigit, x)) >= digit and \
+			count(filter(is_other, x)) >= other
+	return intern(lambda: ValuePredicate([var], check,
+			lambda x: PASSWORD_JS % (size, lower, upper, digit, other, x)),
+		"is_password", var, size, lower, upper, digit, other)
+
+
+class IfError(AbstractPredicate, Subject):
+	"""Predicate displaying the message msg as an error to its error
+	observers when the predicate pred is false."""
+
+	def __init__(self, pred, msg):
+		AbstractPredicate.__init__(self)
+		Subject.__init__(self)
+		self.pred = pred
+		self.msg = msg
+
+	def add_error_observer(self, observer):
+		Subject.add_observer(self, observer)
+
+	def remove_error_observer(self, observer):
+		Subject.remove_observer(self, observer)
+
+	def collect_vars(self, vars):
+		self.pred.collect_vars(vars)
+
+	def check(self):
+		res = self.pred.evaluate()
+		if res:
+			for observer in self.get_observers():
+				observer.clear_message()
+		else:
+			for observer in self.get_observers():
+				observer.show_error(self.msg)
+		return res
 
 def if_error(pred, msg):
 	"""If the predicate is false, display the message as an error to the displayer."""
-	class IfError(AbstractPredicate, Subject):
+	return IfError(pred, msg)
 
-		def __init__(self):
-			AbstractPredicate.__init__(self)
-			Subject.__init__(self)
 
-		def add_error_observer(self, observer):
-			Subject.add_observer(self, observer)
+PYTHON_ONLY_RE = re.compile(r"\(\?[P#aiLmsux>]|\\[AZz]|[*+?}]\+")
 
-		def remove_error_observer(self, observer):
-			Subject.remove_observer(self, observer)
+def regex_to_js(expr):
+	"""Get the Javascript version of the Python regular expression expr or
+	None if it uses constructions specific to Python."""
+	if PYTHON_ONLY_RE.search(expr) is not None:
+		return None
+	else:
+		return expr
 
-		def collect_vars(self, vars):
-			pred.collect_vars(vars)
 
-		def check(self):
-			res = pred.check()
-			if res:
-				for observer in self.get_observers():
-					observer.clear_message()
-			else:
-				for observer in self.get_observers():
-					observer.show_error(msg)
-			return res
+class Match(Predicate):
+	"""Predicate testing if a variable matches a regular expression."""
+	__slots__ = ("var", "regex", "js_regex")
 
-	return IfError()
+	def __init__(self, var, expr):
+		Predicate.__init__(self, [var], pure=True)
+		self.var = var
+		self.regex = re.compile(expr)
+		self.js_regex = regex_to_js(expr)
+
+	def check(self):
+		if ~self.var is None:
+			return False
+		else:
+			return self.regex.fullmatch(~self.var) is not None
 
+	def to_js(self, env):
+		x = env(self.var)
+		if self.js_regex is None or x is None:
+			return None
+		else:
+			return f"((v) => v != null && new RegExp({json.dumps(f'^(?:{self.js_regex})$')}).test(v))({x})"
 
 def matches(var, expr):
 	"""Check if the variable matches the given regular expression."""
-	r = re.compile(expr)
-	class Match(Predicate):
-		def check(self):
-			if ~var is None:
-				return False
-			else:
-				return r.fullmatch(~var) is not None
-	return Match()
+	return intern(lambda: Match(var, expr), "matches", var, expr)
 
 
 def compare(x, y, f):
@@ -765,19 +1234,33 @@ def compare(x, y, f):
 		return xv is not None and yv is not None and f(xv, yv)
 	return g
 
+def safe_compare(f):
+	"""Build a function comparing its arguments with f taking into account
+	None (return False)."""
+	def g(x, y):
+		return x is not None and y is not None and f(x, y)
+	return g
+
+def compare_js(op):
+	"""Build a function compiling the comparison of two Javascript
+	expressions with Javascript operator op taking into account null
+	(return false)."""
+	return lambda x, y: f"((a, b) => a != null && b != null && a {op} b)({x}, {y})"
+
+GT = safe_compare(operator.gt)
+GT_JS = compare_js(">")
+GE = safe_compare(operator.ge)
+GE_JS = compare_js(">=")
+EQ = safe_compare(operator.eq)
+EQ_JS = compare_js("===")
+
 def gt(x, y):
 	"""Build a predicate that x is greater than y."""
-	return Predicate(
-		[v for v in [x, y] if isinstance(v, Var)],
-		fun=compare(x, y, lambda x, y: x > y)
-	)
+	return intern(lambda: ValuePredicate([x, y], GT, GT_JS), "gt", x, y)
 
 def ge(x, y):
 	"""Build a predicate that x is greater or equal than y."""
-	return Predicate(
-		[v for v in [x, y] if isinstance(v, Var)],
-		fun=compare(x, y, lambda x, y: x >= y)
-	)
+	return intern(lambda: ValuePredicate([x, y], GE, GE_JS), "ge", x, y)
 
 def lt(x, y):
 	"""Build a predicate that x is lower than y."""
@@ -789,18 +1272,13 @@ def le(x, y):
 
 def eq(x, y):
 	"""Build a predicate that x is lower than y."""
-	return Predicate(
-		[v for v in [x, y] if isinstance(v, Var)],
-		fun=compare(x, y, lambda x, y: x == y)
-	)
+	return intern(lambda: ValuePredicate([x, y], EQ, EQ_JS), "eq", x, y)
 
 def ne(x, y):
 	"""Build a predicate that x is lower than y."""
-	return Predicate(
-		[v for v in [x, y] if isinstance(v, Var)],
-		fun=lambda: get_value(x) != get_value(y)
-	)
+	return intern(lambda: ValuePredicate([x, y], operator.ne,
+		lambda x, y: f"(({x}) !== ({y}))"), "ne", x, y)
 
-def pred(fun, vars=None):
+def pred(fun, vars=None, pure=False):
 	"""Short to Predicate constructor."""
-	return Predicate(vars, fun)
+	return Predicate(vars, fun, pure=pure)
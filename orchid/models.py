@@ -65,19 +65,19 @@ class ListModel(Subject):
 
 	def append(self, x):
 		"""Append a value."""
-		for obs in self.get_observers():
-			if isinstance(obs, ListObserver):
-				obs.on_append(x)
-			else:
-				obs.update(self)
+		(views, others) = self.split_observers(ListObserver)
+		for obs in views:
+			obs.on_append(x)
+		for obs in others:
+			obs.update(self)
 
 	def insert(self, i, x):
 		""""Insert an element at given position."""
-		for obs in self.get_observers():
-			if isinstance(obs, ListObserver):
-				obs.on_insert(i, x)
-			else:
-				obs.update(self)
+		(views, others) = self.split_observers(ListObserver)
+		for obs in views:
+			obs.on_insert(i, x)
+		for obs in others:
+			obs.update(self)
 
 	def remove(self, x):
 		"""Remove x from the model."""
@@ -85,27 +85,27 @@ class ListModel(Subject):
 
 	def remove_at(self, i):
 		"""Remove element at position i."""
-		for obs in self.filter_observers(ListObserver):
-			if isinstance(obs, ListObserver):
-				obs.on_remove(i)
-			else:
-				obs.update(self)
+		(views, others) = self.split_observers(ListObserver)
+		for obs in views:
+			obs.on_remove(i)
+		for obs in others:
+			obs.update(self)
 
 	def set(self, i, x):
 		"""Change the value of an element."""
-		for obs in self.filter_observers(ListObserver):
-			if isinstance(obs, ListObserver):
-				obs.on_set(i, x)
-			else:
-				obs.update(self)
+		(views, others) = self.split_observers(ListObserver)
+		for obs in views:
+			obs.on_set(i, x)
+		for obs in others:
+			obs.update(self)
 
 	def clear(self):
 		"""Clear the list."""
-		for obs in self.filter_observers(ListObserver):
-			if isinstance(obs, ListObserver):
-				obs.on_clear()
-			else:
-				obs.update(self)
+		(views, others) = self.split_observers(ListObserver)
+		for obs in views:
+			obs.on_clear()
+		for obs in others:
+			obs.update(self)
 
 
 class ListVar(Var, ListModel):
@@ -133,23 +133,33 @@ class ListVar(Var, ListModel):
 
 	def append(self, x):
 		(~self).append(x)
+		self.touch()
 		ListModel.append(self, x)
 
 	def insert(self, i, x):
 		(~self).insert(i, x)
+		self.touch()
 		ListModel.insert(self, i, x)
 
 	def remove_at(self, i):
 		del (~self)[i]
+		self.touch()
 		ListModel.remove_at(self, i)
 
 	def set_index(self, i, x):
 		(~self)[i] = x
+		self.touch()
 		ListModel.set(self, i, x)
 
 	def clear(self):
-		ListModel.clear(self)
+		# list observers may still need the former items
+		(views, others) = self.split_observers(ListObserver)
+		for obs in views:
+			obs.on_clear()
 		(~self).clear()
+		self.touch()
+		for obs in others:
+			obs.update(self)
 
 	def __iter__(self):
 		return iter(~self)
@@ -361,17 +371,20 @@ class SetVar(Var, SetModel):
 		self.set(set)
 
 	def clear(self):
-		SetModel.clear(self)
 		(~self).clear()
+		self.touch()
+		SetModel.clear(self)
 
 	def add(self, item):
 		if item not in ~self:
 			(~self).add(item)
+			self.touch()
 			SetModel.add(self, item)
 
 	def remove(self, item):
 		if item in ~self:
 			(~self).remove(item)
+			self.touch()
 			SetModel.remove(self, item)
 
 	def contains(self, item):
@@ -17,7 +17,7 @@
 
 """This module manage popups: menus."""
 
-from orchid.base import Model
+from orchid.base import Model, Component
 from orchid.group import VGroup
 from orchid.button import Button
 from orchid.image import Icon, IconType
@@ -49,6 +49,36 @@ class Menu(VGroup):
 		self.add_class("menu")
 		self.set_style('display', 'none')
 		self.shown = False
+		self.ready = False
+
+	def finalize(self, page):
+		if self.ready:
+			VGroup.finalize(self, page)
+		else:
+			Component.finalize(self, page)
+
+	def is_prepared(self):
+		return self.ready and VGroup.is_prepared(self)
+
+	def prepare(self):
+		"""Finalize and generate the items of the menu the first time it is
+		shown."""
+		if not self.ready:
+			self.ready = True
+			for child in self.children:
+				child.finalize(self.page)
+			if self.online():
+				self.set_content(self.children)
+			else:
+				self.invalidate()
+
+	def gen(self, out):
+		if self.ready:
+			VGroup.gen(self, out)
+		else:
+			out.write('<div ')
+			self.gen_attrs(out)
+			out.write('></div>\n')
 
 	def is_shown(self):
 		"""Test if the menu is shown."""
@@ -76,6 +106,7 @@ class Menu(VGroup):
 		"""Show the menu."""
 		if self.shown:
 			return
+		self.prepare()
 		VGroup.on_show(self)
 		code = self.get_onclick()
 		onclick = self.page.get_attr("onclick", "")
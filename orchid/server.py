@@ -18,16 +18,22 @@
 """Classes in charge of HTTP communication."""
 
 from functools import partial
+import gc
 import http.server
 import json
 import mimetypes
 import os.path
 import re
+import sys
 import threading
 import time
 from urllib.parse import urlparse
+import weakref
 import webbrowser
 
+from orchid import job
+from orchid.util import ByteBuffer, Observer, Subject
+
 class Provider:
 	"""Interface of objects providing content. Each provider is
 	associated with one or zero paths on the server."""
@@ -41,8 +47,15 @@ class Provider:
 		if self.mime is not None:
 			handler.send_header("Content-type", self.mime)
 
+	def is_static(self):
+		"""Test if the content does not depend on the pages and the
+		application data and can be generated without the lock of the
+		manager. Default implementation returns False."""
+		return False
+
 	def gen(self, out):
-		"""Called to  generate the content to the given output."""
+		"""Called to  generate the content to the given output. The output
+		accepts texts (encoded in UTF-8) and bytes."""
 		pass
 
 
@@ -55,6 +68,9 @@ class FileProvider(Provider):
 		Provider.__init__(self, mime)
 		self.path = path
 
+	def is_static(self):
+		return True
+
 	def gen(self, out):
 
 		# send text file
@@ -83,15 +99,9 @@ class PageProvider(Provider):
 	def __init__(self, page):
 		Provider.__init__(self, "text/html")
 		self.page = page
-		self.out = None
 
 	def gen(self, out):
-		self.out = out
-		self.page.gen(self)
-		self.out = None
-
-	def write(self, text):
-		self.out.write(text.encode('utf-8'))
+		self.page.gen(out)
 
 
 class AppProvider(Provider):
@@ -102,19 +112,68 @@ class AppProvider(Provider):
 		Provider.__init__(self, "text/html")
 		self.app = app
 		self.man = man
-		self.out = None
 
 	def gen(self, out):
-		self.out = out
 		session = self.app.new_session(self.man)
 		page = session.get_index()
 		session.add_page(page)
 		self.man.record_page(page, PageProvider(page))
-		page.gen(self)
-		self.out = None
-
-	def write(self, text):
-		self.out.write(text.encode('utf-8'))
+		page.gen(out)
+
+
+POOL_IDLE_DELAY = .5
+
+class PagePool:
+	"""Pool of index pages built in advance by a background thread, so that
+	a new session does not wait for the construction of its page. The pages
+	are built when the server is idle (no request processed for
+	POOL_IDLE_DELAY seconds), with the lock of the manager held.
+
+	A pooled page is only shown and generated when it is taken: its
+	components bound to variables display their current value. Other data
+	read at the construction of the page may be stale: clear() discards the
+	pooled pages when such data changes."""
+
+	def __init__(self, make, size, manager):
+		self.make = make
+		self.size = size
+		self.manager = manager
+		self.pages = []
+		self.cleared = 0
+		self.cond = threading.Condition()
+		self.thread = threading.Thread(target=self.fill, daemon=True)
+		self.thread.start()
+
+	def take(self):
+		"""Get a page from the pool or build one if the pool is empty."""
+		with self.cond:
+			page = self.pages.pop(0) if self.pages else None
+			self.cond.notify()
+		if page is None:
+			page = self.make()
+		return page
+
+	def clear(self):
+		"""Discard the pooled pages."""
+		with self.cond:
+			self.pages = []
+			self.cleared += 1
+			self.cond.notify()
+
+	def fill(self):
+		"""Refill the pool when pages are taken or discarded."""
+		while True:
+			with self.cond:
+				while len(self.pages) >= self.size:
+					self.cond.wait()
+				cleared = self.cleared
+			self.manager.wait_idle(POOL_IDLE_DELAY)
+			with self.manager.lock:
+				if self.manager.is_idle():
+					page = self.make()
+					with self.cond:
+						if cleared == self.cleared:
+							self.pages.append(page)
 
 
 class TextProvider(Provider):
@@ -124,11 +183,59 @@ class TextProvider(Provider):
 		Provider.__init__(self, mime)
 		self.text = text
 
+	def is_static(self):
+		return True
+
 	def gen(self, out):
 		out.write(self.text.encode('utf-8'))
 
 
 
+RESPONSE_BLOCK_SIZE = 1 << 14
+
+class ResponseWriter:
+	"""Buffered writer for the content of an HTTP response. The written texts
+	(encoded in UTF-8) and bytes are accumulated and sent by blocks of size
+	bytes. If the whole content fits in one block, it is sent with a
+	Content-Length header; otherwise, chunked transfer encoding is used so
+	that the first blocks are sent while the content is generated."""
+
+	def __init__(self, handler, size=RESPONSE_BLOCK_SIZE):
+		self.handler = handler
+		self.size = size
+		self.buf = ByteBuffer()
+		self.chunked = False
+
+	def write(self, text):
+		self.buf.write(text)
+		if len(self.buf) >= self.size:
+			self.flush()
+
+	def flush(self):
+		"""Send the buffered content as a chunk."""
+		out = self.handler.wfile
+		if not self.chunked:
+			self.chunked = True
+			self.handler.send_header("Transfer-Encoding", "chunked")
+			self.handler.end_headers()
+		if self.buf:
+			out.write(b"%x\r\n" % len(self.buf))
+			out.write(self.buf.data)
+			out.write(b"\r\n")
+			self.buf.clear()
+
+	def close(self):
+		"""Terminate the response."""
+		if self.chunked:
+			self.flush()
+			self.handler.wfile.write(b"0\r\n\r\n")
+		else:
+			self.handler.send_header("Content-Length", str(len(self.buf)))
+			self.handler.end_headers()
+			self.handler.wfile.write(self.buf.data)
+		self.buf.clear()
+
+
 GEN_RE = re.compile(r"^\s+<\?\s+(\S+)\s+\?>\s+$")
 
 TEXT_MIMES = {
@@ -158,6 +265,11 @@ class Manager:
 		self.is_server = config['server']
 		self.super = None
 		self.prefix = urlparse(config['proxy']).path
+		self.lock = threading.RLock()
+		self.released = []
+		self.activity = threading.Condition()
+		self.requests = 0
+		self.last_request = 0
 
 	def add_path(self, path, prov):
 		"""Add a path with the given provider. May override an existing one."""
@@ -208,10 +320,73 @@ class Manager:
 		return prov
 
 	def remove_page(self, page):
-		"""Remove a served page."""
+		"""Remove a served page. The page is released so that its components
+		stop observing the application data."""
 		page.manager = None
 		del self.pages[page.get_id()]
 		del self.paths[self.page_path(page)]
+		page.release()
+		if self.config['debug']:
+			self.released.append(weakref.ref(page))
+
+	def check_leaks(self):
+		"""In debug mode, report the components of the released pages that
+		are still observing subjects (variables, models, actions, etc),
+		directly or through a wrapper (see Observer.get_owners()). Called
+		without the lock held."""
+		with self.lock:
+			pages = [ref() for ref in self.released]
+			self.released = []
+		owners = {}
+		for page in pages:
+			if page is not None:
+				owners[id(page)] = page
+				for comp in page.components.values():
+					owners[id(comp)] = page
+		if not owners:
+			return
+		gc.collect()
+		for obj in gc.get_objects():
+			if isinstance(obj, Subject):
+				for obs in obj.get_observers():
+					for owner in obs.get_owners() if isinstance(obs, Observer) else [obs]:
+						page = owners.get(id(owner))
+						if page is not None:
+							self.log_warning(f"leak: {owner} of released page "
+								f"{page.get_id()} still observes {obj}")
+							break
+
+	def log_warning(self, message):
+		"""Report a warning of the server on the standard error."""
+		sys.stderr.write(f"WARNING: {message}\n")
+
+	def begin_request(self):
+		"""Record the start of the processing of a request."""
+		with self.activity:
+			self.requests += 1
+
+	def end_request(self):
+		"""Record the end of the processing of a request."""
+		with self.activity:
+			self.requests -= 1
+			self.last_request = time.monotonic()
+			self.activity.notify_all()
+
+	def is_idle(self):
+		"""Test if no request is being processed."""
+		return self.requests == 0
+
+	def wait_idle(self, delay):
+		"""Wait until no request has been processed for delay seconds."""
+		with self.activity:
+			while True:
+				if self.requests > 0:
+					self.activity.wait()
+				else:
+					rest = self.last_request + delay - time.monotonic()
+					if rest <= 0:
+						return
+					self.activity.wait(rest)
 
 	def get_page(self, id):
 		"""Get the page the provided ID."""
@@ -262,17 +437,35 @@ class Manager:
 		"""Check which session connections needs to be released."""
 		while True:
 			time.sleep(self.check_time)
-			for session in self.sessions:
-				session.check()
+			with self.lock:
+				for session in list(self.sessions):
+					session.check()
+			if self.config['debug']:
+				self.check_leaks()
 
 
 class Handler(http.server.SimpleHTTPRequestHandler):
 	"""Handler for a connection."""
+	protocol_version = "HTTP/1.1"
 
 	def write(self, text):
 		self.wfile.write(bytes(text, "utf-8"))
 
+	def end_headers(self):
+		# the server is single-threaded: one request per connection
+		self.send_header("Connection", "close")
+		http.server.SimpleHTTPRequestHandler.end_headers(self)
+
 	def do_POST(self):
+		manager = self.server.manager
+		manager.begin_request()
+		try:
+			with manager.lock:
+				self.process_POST()
+		finally:
+			manager.end_request()
+
+	def process_POST(self):
 		debug = self.server.manager.config['debug']
 		length = int(self.headers['content-length'])
 		data = self.rfile.read(length)
@@ -283,30 +476,47 @@ class Handler(http.server.SimpleHTTPRequestHandler):
 			page = self.server.manager.get_page(msg["page"])
 		except KeyError:
 			self.log_error(f"malformed message: {msg}")
+			self.send_error(400)
 			return
 		answers = page.receive(msg["messages"], self)
-		self.send_response(200)
-		self.send_header("Content-type", "application/json")
-		self.end_headers()
 		s = json.dumps({"status": "ok", "answers": answers})
 		if debug:
 			print("DEBUG: answer ", s)
-		self.wfile.write(s.encode("utf-8"))
+		data = s.encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
 
 	def do_GET(self):
+		manager = self.server.manager
+		manager.begin_request()
+		try:
+			prov = manager.get(self.path)
+			if prov is not None and prov.is_static():
+				self.process_GET(prov)
+			else:
+				with manager.lock:
+					self.process_GET(prov)
+		finally:
+			manager.end_request()
+
+	def process_GET(self, prov):
 		debug = self.server.manager.config['debug']
-		prov = self.server.manager.get(self.path)
 		if prov is None:
 			self.log_error(f"bad path: {self.path.replace('%', '%%')}")
 			self.send_response(404)
+			self.send_header("Content-Length", "0")
 			self.end_headers()
 			if debug:
 				print("DEBUG: request processed!")
 		else:
 			self.send_response(200)
 			prov.add_headers(self)
-			self.end_headers()
-			prov.gen(self.wfile)
+			out = ResponseWriter(self)
+			prov.gen(out)
+			out.close()
 			if debug:
 				print("DEBUG: request processed!")
 
@@ -329,7 +539,8 @@ DEFAULT_CONFIG = {
 	'session_timeout': 120 * 60,
 	'session_check_time': 10 * 60,
 	'debug': False,
-	'proxy': None
+	'proxy': None,
+	'page_pool': 0
 }
 
 def run(app, **args):
@@ -342,7 +553,8 @@ def run(app, **args):
 	* server -- if true, run as a server (no stop on last page close),
 	* session_timeout -- time-out (in s) of a session,
 	* session_check_time -- time (in s) to check for end of a session,
-	* proxy: when Orchid is behind a proxy, the address in the proxy.
+	* proxy: when Orchid is behind a proxy, the address in the proxy,
+	* page_pool -- number of index pages built in advance (0 for none).
 
 	If behind a reverse-proxy (like generic HTTP server), the proxy address is
 	used to let Javascript pass message to this address. The link inside inside
@@ -365,6 +577,9 @@ def run(app, **args):
 	manager = Manager(app, config)
 	app.manager = manager
 	app.configure(config)
+	job.set_loop(job.EventLoop(manager.lock))
+	if config['page_pool'] > 0:
+		app.pool = PagePool(app.make_first, config['page_pool'], manager)
 
 	# build the server
 	server = http.server.HTTPServer((config['host'], config['port']), Handler)
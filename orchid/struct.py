@@ -1,6 +1,6 @@
 """Component for a structured view."""
 
-from orchid.base import Model
+from orchid.base import Model, cached
 from orchid.util import Context, MessageType, Align
 from orchid.label import Label
 from orchid.group import HGroup, Spring, HGROUP_MODEL, VGroup, Group
@@ -30,6 +30,8 @@ class Header(HGroup):
 	def get_context(self):
 		return Context.HEADERBAR
 
+	gen = cached(HGroup.gen)
+
 
 class ToolBar(HGroup):
 	"""Represent window-level toolbar."""
@@ -43,6 +45,8 @@ class ToolBar(HGroup):
 	def get_context(self):
 		return Context.TOOLBAR
 
+	gen = cached(HGroup.gen)
+
 
 class ButtonBar(HGroup):
 	"""Represents window division toolbar."""
@@ -24,7 +24,7 @@ useful constants.
 import os.path
 
 from orchid import Model, Component
-from orchid.util import Buffer
+from orchid.util import Buffer, buffer
 
 MODEL = Model(
 	"svg-canvas",
@@ -114,9 +114,7 @@ class Shape:
 		pass
 
 	def make_transform(self):
-		buf = Buffer()
-		self.trans.gen(buf)
-		self.attrs["transform"] = str(buf)
+		self.attrs["transform"] = buffer(self.trans.gen)
 
 	def update_transform(self):
 		self.make_transform()
@@ -2,7 +2,8 @@
 
 from orchid.base import Component, Model
 from orchid.models import TableModel, ListTableModel, TableObserver
-from orchid.util import Buffer, Context
+from orchid.template import Template
+from orchid.util import buffer, Context
 
 ACTION_TR	= 0		# TR number
 ACTION_TD	= 1		# TD number
@@ -101,9 +102,9 @@ div.table:hover div.dropdown {
 		self.context_toolbar = context_toolbar
 		if self.context_toolbar is not None:
 			self.context_toolbar.parent = self
-			self.set_attr("onmouseover", "table_over(this, event);")
+			self.set_event("mouseover", "table_over")
 		self.context_row = -1
-		self.set_attr("onclick", f"table_on_click('{self.get_id()}', event);")
+		self.set_event("click", "table_on_click")
 
 	def finalize(self, page):
 		Component.finalize(self, page)
@@ -189,9 +190,8 @@ div.table:hover div.dropdown {
 
 	def on_table_set(self, table):
 		if self.online():
-			buf = Buffer()
-			self.gen_content(buf)
-			self.set_content(str(buf), id=f"{self.get_id()}-table")
+			self.set_content(buffer(self.gen_content),
+				id=f"{self.get_id()}-table")
 
 	def expands_horizontal(self):
 		return True
@@ -199,20 +199,23 @@ div.table:hover div.dropdown {
 	def expands_vertical(self):
 		return True
 
-	def gen(self, out):
-		out.write('<div')
-		self.gen_attrs(out)
-		out.write(f'><table class="table" id="{self.get_id()}-table">')
-		self.gen_content(out)
-		out.write("</table>")
+	TEMPLATE = Template(
+		'<div{gen_attrs}><table class="table" id="{get_id!s}-table">'
+		'{gen_content}</table>{gen_toolbar}</div>')
+
+	def gen_toolbar(self, out):
+		"""Generate the context toolbar, if any."""
 		if self.context_toolbar is not None:
 			self.context_toolbar.gen(out)
-		out.write("</div>")
+
+	def gen(self, out):
+		self.TEMPLATE.gen(out, self)
 
 	def refresh_cell(self, row, col):
 		"""Referesh the content of a cell."""
 		val = self.table.get_cell(row, col)
 		act_row = row if self.no_header else row+1
+		self.structure_changed()
 		self.call("table_change", {
 			"id": f"{self.get_id()}-table",
 			"actions": [ ACTION_TR, act_row, ACTION_TD, col, ACTION_SET, 1 ],
@@ -228,6 +231,7 @@ div.table:hover div.dropdown {
 		"""Called by the model to append a new row."""
 		cnt = len(vals)
 		row = self.table.get_row_count()-1
+		self.structure_changed()
 		self.call("table_change", {
 			"id": f"{self.get_id()}-table",
 			"actions": [
@@ -241,6 +245,7 @@ div.table:hover div.dropdown {
 		"""Called by the model to insert a new row."""
 		cnt = len(vals)
 		act_row = row if self.no_header else row+1
+		self.structure_changed()
 		self.call("table_change", {
 			"id": f"{self.get_id()}-table",
 			"actions": [
@@ -254,6 +259,7 @@ div.table:hover div.dropdown {
 	def on_row_remove(self, table, row):
 		"""Called by the model to remove a row."""
 		act_row = row if self.no_header else row+1
+		self.structure_changed()
 		self.call("table_change", {
 			"id": f"{self.get_id()}-table",
 			"actions": [
@@ -0,0 +1,75 @@
+#
+#	This file is part of Orchid.
+#
+#    Orchid is free software: you can redistribute it and/or modify
+#	it under the terms of the GNU Lesser General Public License as
+#	published by the Free Software Foundation, either version 3 of the
+#	License, or (at your option) any later version.
+#
+#	Orchid is distributed in the hope that it will be useful, but
+#	WITHOUT ANY WARRANTY; without even the implied warranty of
+#	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+#	GNU Lesser General Public License for more details.
+#
+#	You should have received a copy of the GNU Lesser General Public
+#	License along with Orchid. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Templates to generate the HTML of components."""
+
+from operator import methodcaller
+from string import Formatter
+
+
+def gen_slot(name):
+	"""Build the callable for a slot calling the method name of the component
+	with the output."""
+	def gen(comp, out):
+		getattr(comp, name)(out)
+	return gen
+
+def value_slot(name):
+	"""Build the callable for a slot writing the result of the method name
+	of the component."""
+	get = methodcaller(name)
+	def gen(comp, out):
+		out.write(str(get(comp)))
+	return gen
+
+
+class Template:
+	"""HTML markup of a component declared once with slots. The text is
+	compiled at creation into a tuple of static chunks and slot callables
+	shared by all the components using the template. The slots are
+	written between braces (doubled braces stand for a brace):
+	* {name} -- calls the method name(out) of the component,
+	* {name!s} -- writes the result of the method name() of the component.
+
+	For example:
+	```
+	TEMPLATE = Template('<div{gen_attrs}>{gen_content}</div>')
+	...
+	def gen(self, out):
+		self.TEMPLATE.gen(out, self)
+	```"""
+
+	def __init__(self, text):
+		parts = []
+		for (static, name, _, conv) in Formatter().parse(text):
+			if static:
+				parts.append(static)
+			if name is not None:
+				if conv is None:
+					parts.append(gen_slot(name))
+				else:
+					parts.append(value_slot(name))
+		self.parts = tuple(parts)
+
+	def gen(self, out, comp):
+		"""Generate the template for the given component."""
+		write = out.write
+		for part in self.parts:
+			if part.__class__ is str:
+				write(part)
+			else:
+				part(comp, out)
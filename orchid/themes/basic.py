@@ -201,7 +201,8 @@ ICON_MODEL = Model("basic.icon-model")
 class Icon(Image):
 	"""An image using standard icons as defined in the documentation.
 	If the icon name starts with "!", the named is looked in the
-	current icon collection (https://icons.getbootstrap.com/)."""
+	current icon collection (https://icons.getbootstrap.com/).
+	The markup is built once for each context."""
 
 	CONTEXT = {
 		Context.HEADERBAR: " headerbar-icon",
@@ -213,11 +214,13 @@ class Icon(Image):
 		Image.__init__(self, ICON_MODEL)
 		self.type = type
 		self.color = color
+		self.markup = {}
 
 	def gen(self, out):
 		self.gen_in_context(out, Context.NONE)
 
-	def gen_in_context(self, out, context):
+	def make_markup(self, context):
+		"""Build the markup of the icon in the given context."""
 		if isinstance(self.type, str) and self.type.startswith('!'):
 			icon = self.type[1:]
 		else:
@@ -225,15 +228,19 @@ class Icon(Image):
 				icon = ICONS[self.type]
 			except KeyError:
 				icon = ICONS[IconType.IMAGE]
-		out.write(f'<i class="bi bi-{icon}')
+		text = [f'<i class="bi bi-{icon}', Icon.CONTEXT.get(context, " default-icon"), '"']
+		if self.color is not None:
+			text.append(f' style="color: {self.color}"')
+		text.append('></i>')
+		return "".join(text)
+
+	def gen_in_context(self, out, context):
 		try:
-			out.write(Icon.CONTEXT[context])
+			markup = self.markup[context]
 		except KeyError:
-			out.write(" default-icon")
-		out.write('"')
-		if self.color is not None:
-			out.write(f' style="color: {self.color}"')
-		out.write('></i>')
+			markup = self.make_markup(context)
+			self.markup[context] = markup
+		out.write(markup)
 
 
 class BasicTheme(Theme):
@@ -243,9 +250,15 @@ class BasicTheme(Theme):
 			"basic.css",
 			"bootstrap-icons/bootstrap-icons.css"
 		])
+		self.icons = {}
 
 	def get_icon(self, type, color=None):
-		return Icon(type, color)
+		try:
+			return self.icons[(type, color)]
+		except KeyError:
+			icon = Icon(type, color)
+			self.icons[(type, color)] = icon
+			return icon
 
 	def get_dialog_icon(self, type, size=32):
 		if type in MESSAGES:
@@ -21,17 +21,52 @@ from enum import Enum, IntEnum
 import sys
 
 class Buffer:
-	"""Text buffer supporting write function."""
+	"""Text buffer supporting write function. The written texts are
+	collected in a list and only joined when the text is requested: the
+	generation time is linear in the size of the text."""
 
 	def __init__(self, text = ""):
-		self.text = text
+		self.chunks = [text]
 
 	def write(self, text):
-		self.text = self.text + text
+		self.chunks.append(text)
+
+	@property
+	def text(self):
+		"""Get the text written so far."""
+		if len(self.chunks) != 1:
+			self.chunks = ["".join(self.chunks)]
+		return self.chunks[0]
 
 	def __str__(self):
 		return self.text
 
+
+class ByteBuffer:
+	"""Buffer supporting write function that stores the written texts
+	encoded in UTF-8. Bytes can also be written as is."""
+
+	def __init__(self):
+		self.data = bytearray()
+
+	def write(self, text):
+		if isinstance(text, str):
+			text = text.encode("utf-8")
+		self.data += text
+
+	def clear(self):
+		"""Remove the content of the buffer."""
+		self.data.clear()
+
+	def __len__(self):
+		return len(self.data)
+
+	def __bytes__(self):
+		return bytes(self.data)
+
+	def __str__(self):
+		return self.data.decode("utf-8")
+
 def buffer(fun):
 	"""Call function with a buffer to generate a text content and return
 	the produced text."""
@@ -124,10 +159,10 @@ class ProxyInterface(Interface):
 		self.interface.show_error(message)
 
 	def ask_yes_or_no(self, message):
-		self.interface.ask_yes_or_no(message)
+		return self.interface.ask_yes_or_no(message)
 
 	def start_process(self, message):
-		self.interface.process(message)
+		self.interface.start_process(message)
 
 	def complete_process(self):
 		self.interface.complete_process()
@@ -142,6 +177,12 @@ class Observer:
 	def update(self, subject):
 		pass
 
+	def get_owners(self):
+		"""Get the objects on behalf of which the observer is registered
+		(used to report the observers left by released pages). Default
+		returns the observer itself."""
+		return [self]
+
 
 class FunctionObserver(Observer):
 	"""An observer implemented as a function."""
@@ -152,22 +193,78 @@ class FunctionObserver(Observer):
 	def update(self, subject):
 		self.fun(subject)
 
+	def get_owners(self):
+		"""The owners are the object of a bound method and the objects
+		the function closes over."""
+		owners = [self]
+		owner = getattr(self.fun, "__self__", None)
+		if owner is not None:
+			owners.append(owner)
+		for cell in getattr(self.fun, "__closure__", None) or []:
+			try:
+				owners.append(cell.cell_contents)
+			except ValueError:
+				pass
+		return owners
+
 
 class Subject:
-	"""Observer for subject-observer pattern."""
+	"""Observer for subject-observer pattern.
+
+	The observers are recorded by identifier (in their order of addition)
+	with a count of registrations, so that adding and removing an observer
+	is performed in constant time. As with a list, an observer added
+	several times is notified as many times and removing an observer that
+	is not recorded raises ValueError. The tuples of observers returned by
+	get_observers(), filter_observers() and split_observers() are cached
+	by class until the next change of observers: dispatching a notification
+	does neither allocation nor class test, and the observers added or
+	removed during a notification are only taken into account by the next
+	one."""
 
 	def __init__(self):
-		self.observers = []
+		self.observers = {}
+		self.counts = {}
+		self.buckets = {}
+
+	def all_observers(self):
+		"""Iterate on the observers, an observer being repeated as many
+		times as it has been added."""
+		for (key, obs) in self.observers.items():
+			for _ in range(self.counts.get(key, 1)):
+				yield obs
 
 	def get_observers(self):
-		"""Get the list of observers."""
-		return self.observers
+		"""Get the tuple of observers."""
+		try:
+			return self.buckets[None]
+		except KeyError:
+			obs = tuple(self.all_observers())
+			self.buckets[None] = obs
+			return obs
 
 	def filter_observers(self, cls):
-		"""Filter observers with the given class."""
-		for obs in self.observers:
-			if isinstance(obs, cls):
-				yield obs
+		"""Get the tuple of observers with the given class."""
+		try:
+			return self.buckets[cls]
+		except KeyError:
+			obs = tuple(obs for obs in self.all_observers()
+				if isinstance(obs, cls))
+			self.buckets[cls] = obs
+			return obs
+
+	def split_observers(self, cls):
+		"""Get the pair of tuples of observers with the given class and
+		of the other observers."""
+		key = (None, cls)
+		try:
+			return self.buckets[key]
+		except KeyError:
+			obs = (self.filter_observers(cls),
+				tuple(obs for obs in self.all_observers()
+					if not isinstance(obs, cls)))
+			self.buckets[key] = obs
+			return obs
 
 	def add_observer(self, observer):
 		"""Add an observer to the subject. The observer may either implements
@@ -176,16 +273,29 @@ class Subject:
 		Return the build observer that may be passed back to remove_observer()."""
 		if callable(observer):
 			observer = FunctionObserver(observer)
-		self.observers.append(observer)
+		key = id(observer)
+		if key in self.observers:
+			self.counts[key] = self.counts.get(key, 1) + 1
+		else:
+			self.observers[key] = observer
+		self.buckets = {}
 		return observer
 
 	def remove_observer(self, observer):
 		"""Remove an observer from the subject."""
-		self.observers.remove(observer)
+		key = id(observer)
+		if key not in self.observers:
+			raise ValueError(f"{observer} is not an observer")
+		count = self.counts.pop(key, 1)
+		if count > 2:
+			self.counts[key] = count - 1
+		elif count == 1:
+			del self.observers[key]
+		self.buckets = {}
 
 	def update_observers(self):
 		"""Call the update function of the observers."""
-		for observer in self.observers:
+		for observer in self.get_observers():
 			observer.update(self)
 
 # type of context
@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+
+"""Micro-benchmark of the text buffers: the generation time must grow
+linearly with the size of the generated text."""
+
+import time
+
+import orchid as orc
+from orchid.util import buffer
+
+
+class QuadraticBuffer:
+	"""Former implementation of the buffer (for comparison)."""
+
+	def __init__(self):
+		self.text = ""
+
+	def write(self, text):
+		self.text = self.text + text
+
+	def __str__(self):
+		return self.text
+
+
+def fill(buf, n):
+	for i in range(n):
+		buf.write(f"<tr><td>{i}</td><td>row {i}</td></tr>")
+	return str(buf)
+
+def measure(fun):
+	start = time.perf_counter()
+	fun()
+	return time.perf_counter() - start
+
+print("writes      Buffer  ByteBuffer   quadratic")
+for n in [10000, 20000, 40000, 80000]:
+	print(f"{n:6d}  {measure(lambda: fill(orc.Buffer(), n)):10.4f}"
+		f"  {measure(lambda: fill(orc.ByteBuffer(), n)):10.4f}"
+		f"  {measure(lambda: fill(QuadraticBuffer(), n)):10.4f}")
+
+print()
+print("rows   TableView")
+for n in [2500, 5000, 10000, 20000]:
+	table = orc.TableView([[i, f"row {i}", i * 1.5] for i in range(n)])
+	print(f"{n:6d}  {measure(lambda: buffer(table.gen_content)):8.4f}")
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+
+"""Micro-benchmark of the dispatch of notifications to observers: the
+time of a notification must only depend on the number of observers of
+the notified kind and adding/removing an observer must be constant."""
+
+import time
+
+from orchid.models import ListModel, ListObserver
+from orchid.util import FunctionObserver
+
+
+class ListSubject:
+	"""Former implementation of the subject (for comparison)."""
+
+	def __init__(self):
+		self.observers = []
+
+	def get_observers(self):
+		return self.observers
+
+	def add_observer(self, observer):
+		if callable(observer):
+			observer = FunctionObserver(observer)
+		self.observers.append(observer)
+		return observer
+
+	def remove_observer(self, observer):
+		self.observers.remove(observer)
+
+	def append(self, x):
+		for obs in self.get_observers():
+			if isinstance(obs, ListObserver):
+				obs.on_append(x)
+			else:
+				obs.update(self)
+
+
+class View(ListObserver):
+
+	def on_append(self, x):
+		pass
+
+
+class Other:
+
+	def update(self, subject):
+		pass
+
+
+def fill(subject, views, others):
+	for _ in range(views):
+		subject.add_observer(View())
+	for _ in range(others):
+		subject.add_observer(Other())
+	return subject
+
+def dispatch(subject, n):
+	for i in range(n):
+		subject.append(i)
+
+def churn(subject, n):
+	obs = [subject.add_observer(View()) for _ in range(n)]
+	for o in reversed(obs):
+		subject.remove_observer(o)
+
+def measure(fun):
+	start = time.perf_counter()
+	fun()
+	return time.perf_counter() - start
+
+print("dispatch of 10000 appends")
+print("views  others    ListModel  former")
+for (views, others) in [(1, 0), (10, 0), (10, 100), (100, 1000)]:
+	new = fill(ListModel(), views, others)
+	old = fill(ListSubject(), views, others)
+	print(f"{views:5d}  {others:6d}  {measure(lambda: dispatch(new, 10000)):10.4f}"
+		f"  {measure(lambda: dispatch(old, 10000)):7.4f}")
+
+print()
+print("add/remove  ListModel  former")
+for n in [1000, 2000, 4000, 8000]:
+	print(f"{n:10d}  {measure(lambda: churn(ListModel(), n)):9.4f}"
+		f"  {measure(lambda: churn(ListSubject(), n)):7.4f}")
@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+
+"""Test of the lazy layers, dialogs and menus: components inserted into
+a layer, a dialog or a menu not shown yet are only finalized and
+generated when it is shown the first time."""
+
+import orchid as orc
+from orchid import dialog, popup
+from orchid.util import buffer
+
+tab = orc.VGroup([orc.Label("a")])
+tabs = orc.TabbedPane([("One", orc.Label("first")), ("Two", tab)])
+menu = popup.Menu([orc.Button("m1")])
+button = popup.MenuButton(menu, label="menu")
+page = orc.Page(orc.VGroup([tabs, button]))
+box = orc.VGroup([orc.Label("b")])
+dlg = dialog.Base(page, box)
+buffer(page.gen)
+page.messages = []
+
+# changes before the first show
+tab.insert(orc.Label("c"))
+tab.remove(0)
+box.insert(orc.Label("d"))
+box.replace_children([orc.Label("e"), orc.Label("f")])
+menu.insert(orc.Button("m2"))
+assert page.messages == [], page.messages
+for comp in tab.children + box.children + menu.children:
+	assert comp.page is None, comp
+
+# first show
+tabs.select(1)
+dlg.show()
+menu.show_menu(button)
+for comp in tab.children + box.children + menu.children:
+	assert comp.page is page, comp
+	assert comp.get_id() in page.components, comp
+contents = " ".join(msg.get("content", "") for msg in page.messages)
+for text in ["c", "e", "f", "m1", "m2"]:
+	assert f">{text}<" in contents, text
+for text in ["a", "b", "d"]:
+	assert f">{text}<" not in contents, text
+
+print("OK")
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+
+"""Test of batched variable updates: nested batches notify the observers
+once per changed variable, at the exit of the outermost batch, and the
+batches of a thread do not capture the updates of another thread."""
+
+import threading
+
+import orchid as orc
+
+
+class Watcher(orc.Observer):
+
+	def __init__(self):
+		self.log = []
+
+	def update(self, subject):
+		self.log.append((subject, ~subject))
+
+
+x = orc.Var(0)
+y = orc.Var(0)
+z = orc.Var(0)
+calls = []
+fun = lambda var: calls.append((var, ~var))
+x.add_observer(fun)
+y.add_observer(fun)
+x.add_observer(fun)
+watcher = Watcher()
+x.add_observer(watcher)
+y.add_observer(watcher)
+z.add_observer(watcher)
+
+# nested batches
+with orc.batch():
+	x.set(1)
+	with orc.batch():
+		y.set(2)
+		x.set(3)
+	assert calls == [] and watcher.log == [], (calls, watcher.log)
+assert calls == [(x, 3), (y, 2)], calls
+assert watcher.log == [(x, 3), (y, 2)], watcher.log
+
+# batches are local to threads
+calls.clear()
+watcher.log.clear()
+with orc.batch():
+	thread = threading.Thread(target=lambda: z.set(4))
+	thread.start()
+	thread.join()
+	assert watcher.log == [(z, 4)], watcher.log
+	y.set(5)
+	assert watcher.log == [(z, 4)], watcher.log
+assert watcher.log == [(z, 4), (y, 5)], watcher.log
+assert calls == [(y, 5)], calls
+
+print("OK")
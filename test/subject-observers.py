@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+"""Test of the observer registry of subjects: observers added twice are
+notified twice and observers added or removed while a notification is
+dispatched do not corrupt the cached tuples of observers."""
+
+from orchid.models import ListModel, ListObserver
+from orchid.util import Observer
+
+
+class View(ListObserver):
+
+	def __init__(self, log):
+		self.log = log
+
+	def on_append(self, x):
+		self.log.append((self, x))
+
+
+class Detaching(View):
+	"""View removing itself and adding a new view at first notification."""
+
+	def __init__(self, log, model):
+		View.__init__(self, log)
+		self.model = model
+		self.added = None
+
+	def on_append(self, x):
+		View.on_append(self, x)
+		self.model.remove_observer(self)
+		self.added = View(self.log)
+		self.model.add_observer(self.added)
+
+
+class Other(Observer):
+
+	def __init__(self, log):
+		self.log = log
+
+	def update(self, subject):
+		self.log.append((self, None))
+
+
+log = []
+model = ListModel()
+a = View(log)
+model.add_observer(a)
+model.add_observer(a)
+d = Detaching(log, model)
+model.add_observer(d)
+o = Other(log)
+model.add_observer(o)
+
+# double registration: notified twice
+model.append(1)
+assert log == [(a, 1), (a, 1), (d, 1), (o, None)], log
+
+# d detached itself and added a new view, seen from the next notification
+views, others = model.split_observers(ListObserver)
+assert views == (a, a, d.added), views
+assert others == (o,), others
+assert model.get_observers() == (a, a, o, d.added)
+log.clear()
+model.append(2)
+assert log == [(a, 2), (a, 2), (d.added, 2), (o, None)], log
+
+# removal of one registration, then of the last one
+model.remove_observer(a)
+assert model.split_observers(ListObserver)[0] == (a, d.added)
+model.remove_observer(a)
+assert model.split_observers(ListObserver)[0] == (d.added,)
+try:
+	model.remove_observer(a)
+	assert False
+except ValueError:
+	pass
+
+print("OK")